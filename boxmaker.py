@@ -39,21 +39,44 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 __version__ = "0.94"  # please report bugs, suggestions etc at
 # https://github.com/paulh-rnd/TabbedBoxMaker ###
 
+import io
 import math
 import os
+import struct
+import sys
+import time
+import zlib
+from collections import namedtuple
+
+# Anything slow to import (NumPy, multiprocessing, the archive modules and
+# inkex) is imported where it is used, so `import boxmaker` and the command
+# line only pay for what they use.  The Inkscape extension is boxmaker_inkex.py.
+
+MYPY = False
+if MYPY:
+    # This is the typing library for local dev.   Can be ignored in production.  :)
+    # (Only type checkers read it: the types are all in comments, and importing
+    # typing would be a large part of boxmaker's start-up time.)
+    from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
-import inkex
-import simplestyle
+np = None  # NumPy, once load_numpy() has imported it
 
-try:
-    # This is the typing library for local dev.   Can be ignored in production.  :)
-    from typing import Tuple
-except ImportError:
-    pass
 
-inkex.localize()
+def load_numpy():
+    # type: () -> Any
+    """Import NumPy on first use, returning None if it isn't installed.
 
-DEFAULT_LINE_THICKNESS = 1  # default unless overridden by settings
+    Only living hinges and thumbnails need it, and it is by far the slowest
+    module to import.
+    """
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            return None
+        np = numpy
+    return np
 
 
 def log(text):
@@ -62,43 +85,258 @@ def log(text):
         f.write(text + "\n")
 
 
-def draw_lines(xy_string):  # Draw lines from a list
-    name = 'part'
-    style = {'stroke'      : '#000000',
-             'stroke-width': str(DEFAULT_LINE_THICKNESS),
-             'fill'        : 'none'}
-    drw = {'style'                         : simplestyle.formatStyle(style),
-           inkex.addNS('label', 'inkscape'): name, 'd': xy_string}
-    inkex.etree.SubElement(parent, inkex.addNS('path', 'svg'), drw)
-    return
-
-
-# jslee - shamelessly adapted from sample code on below Inkscape wiki page 2015-07-28
-# http://wiki.inkscape.org/wiki/index.php/Generating_objects_from_extensions
-def draw_circle(r, cx, cy):
-    log("putting circle at ({},{})".format(cx, cy))
-
-    style = {'stroke'      : '#000000',
-             'stroke-width': str(DEFAULT_LINE_THICKNESS),
-             'fill'        : 'none'}
-
-    ell_attribs = {'style'                         : simplestyle.formatStyle(style),
-                   inkex.addNS('cx', 'sodipodi')   : str(cx),
-                   inkex.addNS('cy', 'sodipodi')   : str(cy),
-                   inkex.addNS('rx', 'sodipodi')   : str(r),
-                   inkex.addNS('ry', 'sodipodi')   : str(r),
-                   inkex.addNS('start', 'sodipodi'): str(0),
-                   inkex.addNS('end', 'sodipodi')  : str(2 * math.pi),
-                   inkex.addNS('open', 'sodipodi') : 'true',
-                   # all ellipse sectors we will draw are open
-                   inkex.addNS('type', 'sodipodi') : 'arc',
-                   'transform'                     : ''}
-    inkex.etree.SubElement(parent, inkex.addNS('path', 'svg'), ell_attribs)
-
-
-def side(root_coord, start_offset_coord, end_offset_coord, tab_vec, length, direction,
-         is_tab, is_divider, num_dividers, div_spacing, div_offset):
-    # type: (Tuple[int, int], Tuple[int, int], Tuple[int, int], int, int, Tuple[int, int], bool, bool, int, int, int) -> str
+def sgn(value):
+    return (value > 0) - (value < 0)
+
+
+def axis_direction(dx, dy):
+    # type: (float, float) -> Tuple[int, int]
+    """Unit direction of a step along x or y, ignoring rounding error across it."""
+    if abs(dx) >= abs(dy):
+        return sgn(dx), 0
+    return 0, sgn(dy)
+
+
+class FingerJoint(object):
+    """Square finger joint with sharp corners, as cut by a laser.
+
+    This is also the base class for joint primitives.  side() calls corner() at
+    every tab/gap boundary, span() for every tab or gap along an edge and hole()
+    for every divider hole or slot.  Extra geometry is built once per
+    (thickness, tool diameter, correction) by make_templates(), in a canonical
+    frame where the corner is at the origin, the path arrives along +x and
+    leaves along -y.  stamp() rotates/mirrors it into each of the eight
+    axis-aligned orientations once, as a relative path ('l dx,dy ...') that
+    starts and ends on the corner, so placing a relief is only a string append.
+    """
+    name = 'finger'
+    relief_names = ('relief',)  # the templates variant() can return
+
+    def __init__(self, thickness, tool_diameter, correction, hardware=None):
+        # type: (float, float, float, Optional[Dict[str, float]]) -> None
+        self.thickness = thickness
+        self.tool_diameter = tool_diameter
+        self.correction = correction
+        self.hardware = hardware or {}
+        self.templates = self.make_templates()
+        self._stamps = {}
+
+    def make_templates(self):
+        # type: () -> Dict[str, List[Tuple[float, float]]]
+        return {}
+
+    def variant(self, u, edge):
+        # type: (Tuple[int, int], Tuple[int, int]) -> str
+        """Name of the relief template to use at a corner arrived at along `u`."""
+        return 'relief'
+
+    def stamp(self, x, y, u, v, edge):
+        # type: (float, float, Tuple[int, int], Tuple[int, int], Tuple[int, int]) -> str
+        """Relative path of the corner relief at (x, y), or '' if there is none."""
+        key = (self.variant(u, edge), u, v)
+        stamp = self._stamps.get(key)
+        if stamp is None:
+            stamp = self._stamps[key] = self.make_stamp(*key)
+        return stamp
+
+    def make_stamp(self, name, u, v):
+        # type: (str, Tuple[int, int], Tuple[int, int]) -> str
+        """Template `name` turned to arrive along `u` and leave along `v` (see stamp())."""
+        (ux, uy), (vx, vy) = u, v
+        stamp = ''
+        (lx, ly) = (0, 0)
+        for (tx, ty) in self.templates.get(name, ()):
+            (ox, oy) = (ux * tx - vx * ty, uy * tx - vy * ty)
+            stamp += 'l {},{} '.format(ox - lx, oy - ly)
+            (lx, ly) = (ox, oy)
+        return stamp
+
+    def reliefs(self):
+        # type: () -> List[str]
+        """Every corner relief stamp() can place, as the relative paths it appends.
+
+        They are longest first, so that none is stripped out of a longer one.
+        """
+        turns = [(u, v) for u in ((1, 0), (0, 1), (-1, 0), (0, -1))
+                 for v in ((u[1], -u[0]), (-u[1], u[0]))]
+        found = set(self.make_stamp(name, u, v) for name in self.relief_names
+                    for (u, v) in turns)
+        found.discard('')
+        return sorted(found, key=len, reverse=True)
+
+    def corner(self, x, y, u, v, edge):
+        # type: (float, float, Tuple[int, int], Tuple[int, int], Tuple[int, int]) -> str
+        """Outline vertex at (x, y), arriving along `u` and leaving along `v`.
+
+        Pieces are drawn clockwise, so only corners turning left (inside corners)
+        get a relief.
+        """
+        s = 'L {},{} '.format(x, y)
+        if self.templates and u[0] * v[1] - u[1] * v[0] < 0:
+            s += self.stamp(x, y, u, v, edge)
+        return s
+
+    def span(self, start, end, edge, index, divs, inner, tabbed, holes):
+        # type: (Tuple[float, float], Tuple[float, float], Tuple[int, int], int, int, bool, bool, List[str]) -> str
+        """Vertices to insert along the tab or gap from `start` to `end`.
+
+        `index` counts the spans of an edge of `divs` spans, and `inner` is true
+        for gaps (where the mating piece's tab sits).  Holes may be appended to
+        `holes`.
+        """
+        return ''
+
+    def hole(self, points, edge):
+        # type: (List[Tuple[float, float]], Tuple[int, int]) -> str
+        """Path of a closed rectangular hole; every corner is an inside corner."""
+        s = 'M {},{} '.format(*points[0])
+        if not self.templates:
+            return s + ''.join(['L {},{} '.format(*p) for p in points[1:]])
+        for i, (px, py) in enumerate(points[:-1]):
+            (lx, ly), (nx, ny) = points[i - 1 if i else -2], points[i + 1]
+            u = axis_direction(px - lx, py - ly)
+            v = axis_direction(nx - px, ny - py)
+            if i:
+                s += 'L {},{} '.format(px, py)
+            if u[0] * v[1] - u[1] * v[0]:
+                s += self.stamp(px, py, u, v, edge)
+        return s + 'L {},{} '.format(*points[-1])
+
+
+def circle_points(cx, cy, r, start, segments=8):
+    # type: (float, float, float, float, int) -> List[Tuple[float, float]]
+    """Loop around a circle from the point at angle `start`, ending back on it.
+
+    The polygon's sides are tangent to the circle, so a relief or screw hole
+    drawn with it is never smaller than the circle.
+    """
+    big_r = r / math.cos(math.pi / segments)
+    points = [(cx + big_r * math.cos(start + math.pi * (2 * k + 1) / segments),
+               cy + big_r * math.sin(start + math.pi * (2 * k + 1) / segments))
+              for k in range(segments)]
+    return points + [(cx + r * math.cos(start), cy + r * math.sin(start))]
+
+
+class DogboneJoint(FingerJoint):
+    """Finger joint with dogbone reliefs for cutting with a round router bit.
+
+    Inside corners are overcut diagonally by a circle the size of the tool, so
+    the mating square corner fits.
+    """
+    name = 'dogbone'
+
+    def make_templates(self):
+        r = (self.tool_diameter - self.correction) / 2
+        if r <= 0:
+            return {}
+        c = r / math.sqrt(2)
+        return {'relief': circle_points(c, c, r, math.radians(225))}
+
+
+class TBoneJoint(FingerJoint):
+    """Finger joint with T-bone reliefs: overcuts run along the edge only."""
+    name = 'tbone'
+    relief_names = ('along', 'across')
+
+    def make_templates(self):
+        r = (self.tool_diameter - self.correction) / 2
+        if r <= 0:
+            return {}
+        return {'along': circle_points(r, 0, r, math.pi),
+                'across': circle_points(0, r, r, math.radians(270))}
+
+    def variant(self, u, edge):
+        return 'along' if u[0] * edge[1] == u[1] * edge[0] else 'across'
+
+
+class TSlotJoint(FingerJoint):
+    """Finger joint held by captive-nut T-slot screw fasteners, for thick stock.
+
+    Every `pitch` spans, counting out from the middle of an edge (so mating
+    edges agree whichever way they are drawn), a gap gets a T-slot for the
+    screw and nut and a tab gets a screw clearance hole.  The first and last
+    spans are never fastened: they are the corner notches, where the mating
+    piece's thickness is rather than a tab of it.
+    """
+    name = 'tslot'
+    pitch = 4
+
+    def make_templates(self):
+        correction = self.correction
+        w = (self.hardware['screw_diameter'] - correction) / 2
+        nut_w = (self.hardware['nut_width'] - correction) / 2
+        depth = self.hardware['screw_length'] - self.thickness
+        nut_start = (depth - self.hardware['nut_thickness']) / 2
+        nut_end = nut_start + self.hardware['nut_thickness'] - correction
+        # slot frame: x along the edge, y into the piece, origin mid-gap
+        return {'slot': [(-w, 0), (-w, nut_start), (-nut_w, nut_start),
+                         (-nut_w, nut_end), (-w, nut_end), (-w, depth), (w, depth),
+                         (w, nut_end), (nut_w, nut_end), (nut_w, nut_start),
+                         (w, nut_start), (w, 0)],
+                'hole': circle_points(0, 0, w, 0)}
+
+    def span(self, start, end, edge, index, divs, inner, tabbed, holes):
+        if (not tabbed or index in (0, divs - 1) or
+                (index - (divs - 1) // 2) % self.pitch):
+            return ''
+        (ex, ey) = edge
+        (nx, ny) = (-ey, ex)  # into the piece, as pieces are drawn clockwise
+        mx = (start[0] + end[0]) / 2
+        my = (start[1] + end[1]) / 2
+        if inner:
+            return ''.join(['L {},{} '.format(mx + ex * tx + nx * ty, my + ey * tx + ny * ty)
+                            for (tx, ty) in self.templates['slot']])
+        # screw hole through the middle of the tab
+        mx += nx * self.thickness / 2
+        my += ny * self.thickness / 2
+        points = self.templates['hole']
+        h = 'M {},{} '.format(mx + points[-1][0], my + points[-1][1])
+        holes.append(h + ''.join(['L {},{} '.format(mx + px, my + py)
+                                  for (px, py) in points]))
+        return ''
+
+
+JOINT_TYPES = {'finger' : FingerJoint,
+               'dogbone': DogboneJoint,
+               'tbone'  : TBoneJoint,
+               'tslot'  : TSlotJoint}
+
+_joint_cache = {}  # type: Dict[tuple, FingerJoint]
+
+
+def get_joint(name, thickness, tool_diameter, correction, hardware=None):
+    # type: (str, float, float, float, Optional[Dict[str, float]]) -> FingerJoint
+    """The joint primitive `name`, built once per set of dimensions."""
+    key = (name, thickness, tool_diameter, correction,
+           tuple(sorted((hardware or {}).items())))
+    if key not in _joint_cache:
+        _joint_cache[key] = JOINT_TYPES[name](thickness, tool_diameter, correction,
+                                              hardware)
+    return _joint_cache[key]
+
+
+def side(settings, joint, root_coord, start_offset_coord, end_offset_coord, tab_vec,
+         length, direction, is_tab, is_divider, num_dividers, div_spacing, div_offset,
+         holes, margin=0, outline=True, keep_clear=()):
+    # type: (Dict[str, Any], FingerJoint, Tuple[int, int], Tuple[int, int], Tuple[int, int], int, int, Tuple[int, int], bool, bool, int, int, int, List[str], float, bool, List[Tuple[float, float]]) -> str
+    # divider holes and slots are appended to `holes` rather than drawn, so that
+    # pieces can be generated away from the document (see generate_job).
+    # The tabs come from the box's `settings`, and the shape of each tab/gap
+    # corner, span and hole from its `joint` primitive (see FingerJoint and
+    # box_joint()).
+    # `margin` keeps the tabs that far from each end of the side, leaving room
+    # for living hinges; the first and last span are lengthened to match, and
+    # as they reach round the box's corners the joint's own features along the
+    # side (eg. T-slot screw holes) are left off them.
+    # With `outline` false only the divider holes are wanted, and the joint's
+    # features are left off every span.
+    # `keep_clear` are the (from, to) distances along the side where dividers
+    # cross it; the joint's features are left off spans that overlap them.  The
+    # spans are measured before kerf correction, so mating sides agree.
+
+    nom_tab = settings['nom_tab']
+    thickness = settings['thickness']
+    correction = settings['correction']
 
     rx, ry = root_coord
 
@@ -108,17 +346,24 @@ def side(root_coord, start_offset_coord, end_offset_coord, tab_vec, length, dire
 
     dir_x, dir_y = direction
 
-    divs = int(length / nom_tab)  # divisions
+    tab_length = length - 2 * margin  # length laid out with tabs
+    divs = int(tab_length / nom_tab)  # divisions
     if not divs % 2:
         divs -= 1  # make divs odd
     divs = float(divs)
     tabs = (divs - 1) / 2  # tabs for side
 
-    if equal_tabs:
-        gap_width = tab_width = length / divs
+    if settings['equal_tabs']:
+        gap_width = tab_width = tab_length / divs
     else:
         tab_width = nom_tab
-        gap_width = (length - tabs * nom_tab) / (divs - tabs)
+        gap_width = (tab_length - tabs * nom_tab) / (divs - tabs)
+    # where each span starts, for keep_clear
+    starts = [margin + (k + 1) // 2 * gap_width + k // 2 * tab_width for k in range(int(divs))]
+    starts[0] = 0
+    starts.append(length)
+    clear = [outline and not any(lo < starts[k + 1] and starts[k] < hi for (lo, hi) in keep_clear)
+             for k in range(int(divs))]
 
     if is_tab:  # kerf correction
         gap_width -= correction
@@ -131,6 +376,7 @@ def side(root_coord, start_offset_coord, end_offset_coord, tab_vec, length, dire
 
     first_vec = 0
     second_vec = tab_vec
+    lead = margin  # extra length of the first span
     dirxN = 0 if dir_x else 1  # used to select operation on x or y
     diryN = 0 if dir_y else 1
     (Vx, Vy) = (rx + sox * thickness, ry + soy * thickness)
@@ -146,690 +392,2358 @@ def side(root_coord, start_offset_coord, end_offset_coord, tab_vec, length, dire
     #   divisions:divs ; gap width:gap_width ; tab width:tab_width
 
     for n in range(1, int(divs)):
+        span_start = (Vx, Vy)
         if ((n % 2) ^ (
                 not is_tab)) and num_dividers > 0 and not is_divider:  # draw holes for
             # divider
             # joints in side walls
             w = gap_width if is_tab else tab_width
-            if n == 1:
-                w -= sox * thickness
+            if n == 1:  # the first hole starts where the side does
+                w += margin - (diryN * sox + dirxN * soy) * thickness
             for m in range(1, int(num_dividers) + 1):
                 Dx = Vx + -dir_y * div_spacing * m
                 Dy = Vy + dir_x * div_spacing * m
                 if n == 1:
-                    Dx += sox * thickness
-                h = 'M {},{} '.format(Dx, Dy)
+                    Dx += diryN * sox * thickness
+                    Dy += dirxN * soy * thickness
+                h = [(Dx, Dy)]
 
                 Dx = Dx + dir_x * w + dirxN * first_vec + first * dir_x
                 Dy = Dy + dir_y * w + diryN * first_vec + first * dir_y
-                h += 'L {},{} '.format(Dx, Dy)
+                h.append((Dx, Dy))
 
                 Dx += dirxN * second_vec
                 Dy += diryN * second_vec
-                h += 'L {},{} '.format(Dx, Dy)
+                h.append((Dx, Dy))
 
                 Dx = Dx - (dir_x * w + dirxN * first_vec + first * dir_x)
                 Dy = Dy - (dir_y * w + diryN * first_vec + first * dir_y)
-                h += 'L {},{} '.format(Dx, Dy)
+                h.append((Dx, Dy))
 
                 Dx -= dirxN * second_vec
                 Dy -= diryN * second_vec
-                h += 'L {},{} '.format(Dx, Dy)
+                h.append((Dx, Dy))
 
-                draw_lines(h)
+                holes.append(joint.hole(h, (dir_x, dir_y)))
         if n % 2:
             if n == 1 and num_dividers > 0 and is_divider:  # draw slots for dividers
                 # to slot into each other
                 for m in range(1, int(num_dividers) + 1):
                     Dx = Vx + -dir_y * (div_spacing * m + div_offset)
                     Dy = Vy + dir_x * (div_spacing * m - div_offset)
-                    h = 'M {},{} '.format(Dx, Dy)
+                    h = [(Dx, Dy)]
 
                     Dx = Dx + dir_x * (first + length / 2)
                     Dy = Dy + dir_y * (first + length / 2)
-                    h += 'L {},{} '.format(Dx, Dy)
+                    h.append((Dx, Dy))
 
                     Dx = Dx + dirxN * thickness
                     Dy = Dy + diryN * thickness
-                    h += 'L {},{} '.format(Dx, Dy)
+                    h.append((Dx, Dy))
 
                     Dx = Dx - dir_x * (first + length / 2)
                     Dy = Dy - dir_y * (first + length / 2)
-                    h += 'L {},{} '.format(Dx, Dy)
+                    h.append((Dx, Dy))
 
                     Dx = Dx - dirxN * thickness
                     Dy = Dy - diryN * thickness
-                    h += 'L {},{} '.format(Dx, Dy)
-
-                    draw_lines(h)
+                    h.append((Dx, Dy))
 
-            Vx = Vx + dir_x * gap_width + dirxN * first_vec + first * dir_x
-            Vy = Vy + dir_y * gap_width + diryN * first_vec + first * dir_y
-            s += 'L {},{} '.format(Vx, Vy)
+                    holes.append(joint.hole(h, (dir_x, dir_y)))
 
-            Vx = Vx + dirxN * second_vec
-            Vy = Vy + diryN * second_vec
-            s += 'L {},{} '.format(Vx, Vy)
+            Vx = Vx + dir_x * (gap_width + lead) + dirxN * first_vec + first * dir_x
+            Vy = Vy + dir_y * (gap_width + lead) + diryN * first_vec + first * dir_y
         else:
             Vx = Vx + dir_x * tab_width + dirxN * first_vec
             Vy = Vy + dir_y * tab_width + diryN * first_vec
-            s += 'L {},{} '.format(Vx, Vy)
-
-            Vx = Vx + dirxN * second_vec
-            Vy = Vy + diryN * second_vec
-            s += 'L {},{} '.format(Vx, Vy)
+        if clear[n - 1] and not (margin and n == 1):
+            s += joint.span(span_start, (Vx, Vy), direction, n - 1, int(divs),
+                            bool(n % 2) == bool(is_tab), bool(tab_vec), holes)
+        tab_dir = (dirxN * sgn(second_vec), diryN * sgn(second_vec))
+        s += joint.corner(Vx, Vy, direction, tab_dir, direction)
+
+        Vx = Vx + dirxN * second_vec
+        Vy = Vy + diryN * second_vec
+        s += joint.corner(Vx, Vy, tab_dir, direction, direction)
         (second_vec, first_vec) = (-second_vec, -first_vec)  # swap tab direction
         first = 0
+        lead = 0
 
     # finish the line off
-    s += 'L {},{} '.format(rx + eox * thickness + dir_x * length,
-                           ry + eoy * thickness + dir_y * length)
+    end = (rx + eox * thickness + dir_x * length, ry + eoy * thickness + dir_y * length)
+    if clear[-1] and not margin:
+        s += joint.span((Vx, Vy), end, direction, int(divs) - 1, int(divs), bool(is_tab),
+                        bool(tab_vec), holes)
+    s += 'L {},{} '.format(*end)
     if is_tab and num_dividers > 0 and not is_divider:  # draw last for divider joints
         # in side walls
         for m in range(1, int(num_dividers) + 1):
-            Dx = Vx
-            Dy = Vy + dir_x * div_spacing * m
-            h = 'M {},{} '.format(Dx, Dy)
+            Sx = Vx + -dir_y * div_spacing * m
+            Sy = Vy + dir_x * div_spacing * m
+            h = [(Sx, Sy)]
 
-            Dx = rx + eox * thickness + dir_x * length
-            Dy = Dy + dir_y * tab_width + diryN * first_vec + first * dir_y
-            h += 'L {},{} '.format(Dx, Dy)
+            # the last hole runs to the end of the side
+            Dx = end[0] if dir_x else Sx + dirxN * first_vec
+            Dy = end[1] if dir_y else Sy + diryN * first_vec
+            h.append((Dx, Dy))
 
             Dx = Dx + dirxN * second_vec
             Dy = Dy + diryN * second_vec
-            h += 'L {},{} '.format(Dx, Dy)
+            h.append((Dx, Dy))
 
-            Dx = Vx
-            Dy = Dy - (dir_y * tab_width + diryN * first_vec + first * dir_y)
-            h += 'L {},{} '.format(Dx, Dy)
+            Dx = Sx if dir_x else Dx - dirxN * first_vec
+            Dy = Sy if dir_y else Dy - diryN * first_vec
+            h.append((Dx, Dy))
 
             Dx = Dx - dirxN * second_vec
             Dy = Dy - diryN * second_vec
-            h += 'L {},{} '.format(Dx, Dy)
+            h.append((Dx, Dy))
 
-            draw_lines(h)
+            holes.append(joint.hole(h, (dir_x, dir_y)))
     return s
 
 
-class BoxMaker(inkex.Effect):
-    def __init__(self):
-        # Call the base class constructor.
-        # We are not using super because as of Inkscape 0.92 inkex.Effect is still an
-        #   Old-Style python class that doesn't inherit from `object`
-        inkex.Effect.__init__(self)
-        # Define options
-        self.OptionParser.add_option('--schroff', action='store', type='int',
-                                     dest='schroff', default=0,
-                                     help='Enable Schroff mode')
-        self.OptionParser.add_option('--rail_height', action='store', type='float',
-                                     dest='rail_height', default=10.0,
-                                     help='Height of rail')
-        self.OptionParser.add_option('--rail_mount_depth', action='store', type='float',
-                                     dest='rail_mount_depth', default=17.4,
-                                     help='Depth at which to place hole for rail mount '
-                                          'bolt')
-        self.OptionParser.add_option('--rail_mount_centre_offset', action='store',
-                                     type='float',
-                                     dest='rail_mount_centre_offset', default=0.0,
-                                     help='How far toward row centreline to offset rail '
-                                          'mount bolt (from rail centreline)')
-        self.OptionParser.add_option('--rows', action='store', type='int',
-                                     dest='rows', default=0,
-                                     help='Number of Schroff rows')
-        self.OptionParser.add_option('--hp', action='store', type='int',
-                                     dest='hp', default=0,
-                                     help='Width (TE/HP units) of Schroff rows')
-        self.OptionParser.add_option('--row_spacing', action='store', type='float',
-                                     dest='row_spacing', default=10.0,
-                                     help='Height of rail')
-        self.OptionParser.add_option('--unit', action='store', type='string',
-                                     dest='unit', default='mm', help='Measure Units')
-        self.OptionParser.add_option('--inside', action='store', type='int',
-                                     dest='inside', default=0, help='Int/Ext Dimension')
-        self.OptionParser.add_option('--length', action='store', type='float',
-                                     dest='length', default=100, help='Length of Box')
-        self.OptionParser.add_option('--width', action='store', type='float',
-                                     dest='width', default=100, help='Width of Box')
-        self.OptionParser.add_option('--depth', action='store', type='float',
-                                     dest='height', default=100, help='Height of Box')
-        self.OptionParser.add_option('--tab', action='store', type='float',
-                                     dest='tab', default=25, help='Nominal Tab Width')
-        self.OptionParser.add_option('--equal', action='store', type='int',
-                                     dest='equal', default=0, help='Equal/Prop Tabs')
-        self.OptionParser.add_option('--hairline', action='store', type='int',
-                                     dest='hairline', default=0, help='Line Thickness')
-        self.OptionParser.add_option('--thickness', action='store', type='float',
-                                     dest='thickness', default=10,
-                                     help='Thickness of Material')
-        self.OptionParser.add_option('--kerf', action='store', type='float',
-                                     dest='kerf', default=0.5, help='Kerf (width) of cut')
-        self.OptionParser.add_option('--clearance', action='store', type='float',
-                                     dest='clearance', default=0.01,
-                                     help='Clearance of joints')
-        self.OptionParser.add_option('--style', action='store', type='int',
-                                     dest='style', default=25, help='Layout/Style')
-        self.OptionParser.add_option('--spacing', action='store', type='float',
-                                     dest='spacing', default=25, help='Part Spacing')
-        self.OptionParser.add_option('--boxtype', action='store', type='int',
-                                     dest='boxtype', default=25, help='Box type')
-        self.OptionParser.add_option('--div_l', action='store', type='int',
-                                     dest='div_l', default=25,
-                                     help='Dividers (Length axis)')
-        self.OptionParser.add_option('--div_w', action='store', type='int',
-                                     dest='div_w', default=25,
-                                     help='Dividers (Width axis)')
-        self.OptionParser.add_option('--keydiv', action='store', type='int',
-                                     dest='keydiv', default=3,
-                                     help='Key dividers into walls/floor')
-
-    def effect(self):
-        global parent, nom_tab, equal_tabs, thickness, correction, div_x, div_y, \
-            hairline, DEFAULT_LINE_THICKNESS, key_div_walls, key_div_floor
-
-        # Get access to main SVG document element and get its dimensions.
-        svg = self.document.getroot()
-
-        # Get the attributes:
-        width_doc = self.unittouu(svg.get('width'))
-        height_doc = self.unittouu(svg.get('height'))
-
-        # Create a new layer.
-        layer = inkex.etree.SubElement(svg, 'g')
-        layer.set(inkex.addNS('label', 'inkscape'), 'newlayer')
-        layer.set(inkex.addNS('groupmode', 'inkscape'), 'layer')
-
-        parent = self.current_layer
-
-        # Get script's option values.
-        hairline = self.options.hairline
-        unit = self.options.unit
-        inside = self.options.inside
-        schroff = self.options.schroff
-
-        # Set the line thickness
-        if hairline:
-            DEFAULT_LINE_THICKNESS = self.unittouu('0.002in')
+def box_joint(settings):
+    # type: (Dict[str, Any]) -> FingerJoint
+    """The joint primitive of a box with these settings (see get_joint()).
+
+    The piece builders take the settings and joint as arguments rather than
+    sharing any state, so boxes can be generated on several threads at once.
+    """
+    return get_joint(settings['joint'], settings['thickness'], settings['tool_diameter'],
+                     settings['correction'], settings['hardware'])
+
+
+def box_settings(options, unittouu):
+    # type: (Dict[str, Any], Callable[[str], float]) -> Dict[str, Any]
+    """Convert extension option values into a box settings dict in user units.
+
+    `options` is keyed by option dest name (as from vars(self.options)) and
+    `unittouu` converts a '<value><unit>' string into user units.
+    """
+    unit = options['unit']
+    schroff = options['schroff']
+
+    def uu(value):
+        return unittouu(str(value) + unit)
+
+    # Set the line thickness
+    if options['hairline']:
+        line_thickness = unittouu('0.002in')
+    else:
+        line_thickness = 1
+
+    settings = {'schroff'       : schroff,
+                'line_thickness': line_thickness}
+
+    # minimally different behaviour for schroffmaker.inx vs. boxmaker.inx
+    # essentially schroffmaker.inx is just an alternate interface with different
+    # default settings, some options removed, and a tiny amount of extra logic
+    if schroff:
+        # schroffmaker.inx
+        rows = options['rows']
+        rail_height = uu(options['rail_height'])
+        row_centre_spacing = uu(122.5)
+        row_spacing = uu(options['row_spacing'])
+        settings.update({'rows'                    : rows,
+                         'rail_height'             : rail_height,
+                         'row_centre_spacing'      : row_centre_spacing,
+                         'row_spacing'             : row_spacing,
+                         'rail_mount_depth'        : uu(options['rail_mount_depth']),
+                         'rail_mount_centre_offset': uu(
+                             options['rail_mount_centre_offset']),
+                         'rail_mount_radius'       : uu(2.5)})
+        x = uu(options['hp'] * 5.08)
+        # 122.5mm vertical distance between mounting hole centres of 3U Schroff panels
+        row_height = rows * (row_centre_spacing + rail_height)
+        # rail spacing in between rows but never between rows and case panels
+        row_spacing_total = (rows - 1) * row_spacing
+        y = row_height + row_spacing_total
+    else:
+        # boxmaker.inx
+        x = uu(options['length'])
+        y = uu(options['width'])
+
+    z = uu(options['height'])
+    thickness = uu(options['thickness'])
+    kerf = uu(options['kerf'])
+    clearance = uu(options['clearance'])
+    key_div_walls = 0 if options['keydiv'] == 3 or options['keydiv'] == 1 else 1
+    key_div_floor = 0 if options['keydiv'] == 3 or options['keydiv'] == 2 else 1
+
+    if options['inside']:  # if inside dimension selected correct values to outside
+        # dimension
+        x += thickness * 2
+        y += thickness * 2
+        z += thickness * 2
+
+    settings.update({'x'            : x,
+                     'y'            : y,
+                     'z'            : z,
+                     'thickness'    : thickness,
+                     'nom_tab'      : uu(options['tab']),
+                     'equal_tabs'   : options['equal'],
+                     'kerf'         : kerf,
+                     'correction'   : kerf - clearance,
+                     'layout'       : options['style'],
+                     'spacing'      : uu(options['spacing']),
+                     'box_type'     : options['boxtype'],
+                     'div_x'        : options['div_l'],
+                     'div_y'        : options['div_w'],
+                     'key_div_walls': key_div_walls,
+                     'key_div_floor': key_div_floor,
+                     'div_offset'   : key_div_walls * thickness,
+                     'hinge'        : options['hinge'],
+                     'hinge_width'  : uu(options['hinge_width']),
+                     'slit_length'  : uu(options['slit_length']),
+                     'slit_spacing' : uu(options['slit_spacing']),
+                     'hinge_bridge' : uu(options['hinge_bridge']),
+                     'joint'        : options['joint'],
+                     'tool_diameter': uu(options['tool_diameter']),
+                     'hardware'     : {'screw_diameter': uu(options['screw_diameter']),
+                                       'screw_length'  : uu(options['screw_length']),
+                                       'nut_width'     : uu(options['nut_width']),
+                                       'nut_thickness' : uu(options['nut_thickness'])}})
+    return settings
+
+
+def check_settings(settings, doc_size=None):
+    # type: (Dict[str, Any], Optional[float]) -> List[str]
+    """Return the error messages for settings that can't make a box.
+
+    `doc_size` is the larger document dimension; the size check against it is
+    skipped when there is no document (eg. batch output).
+    """
+    # check input values mainly to avoid python errors
+    # TODO restrict values to *correct* solutions
+    # TODO restrict divisions to logical values
+    x, y, z = settings['x'], settings['y'], settings['z']
+    nom_tab = settings['nom_tab']
+    thickness = settings['thickness']
+    spacing = settings['spacing']
+    errors = []
+
+    if min(x, y, z) == 0:
+        errors.append('Error: Dimensions must be non zero')
+    if doc_size is not None and max(x, y, z) > doc_size * 10:  # crude test
+        errors.append('Error: Dimensions Too Large')
+    if min(x, y, z) < 3 * nom_tab:
+        errors.append('Error: Tab size too large')
+    if nom_tab < thickness:
+        errors.append('Error: Tab size too small')
+    if thickness == 0:
+        errors.append('Error: Thickness is zero')
+    if thickness > min(x, y, z) / 3:  # crude test
+        errors.append('Error: Material too thick')
+    if settings['correction'] > min(x, y, z) / 3:  # crude test
+        errors.append('Error: Kerf/Clearance too large')
+    if spacing > max(x, y, z) * 10:  # crude test
+        errors.append('Error: Spacing too large')
+    if spacing < settings['kerf']:
+        errors.append('Error: Spacing too small')
+    if settings['hinge']:
+        if load_numpy() is None:
+            errors.append('Error: Living hinges need NumPy')
+        if settings['slit_length'] <= 0 or settings['slit_spacing'] <= settings['kerf']:
+            errors.append('Error: Hinge slits too small')
+        if settings['box_type'] not in (1, 2, 5):
+            errors.append('Error: Living hinges need all four walls')
+        if settings['layout'] == 4:
+            errors.append('Error: Living hinges can\'t use alternate tabs')
+        radius = hinge_radius(settings)
+        if 2 * radius + 3 * nom_tab > min(x, y):
+            errors.append('Error: Hinge too wide')
+        # divider holes in the walls have to be on the flat between the corners
+        elif (settings['div_y'] and (x - thickness) / (settings['div_y'] + 1) < radius or
+              settings['div_x'] and (y - thickness) / (settings['div_x'] + 1) < radius):
+            errors.append('Error: Dividers too close to the hinges')
+    if settings['joint'] not in JOINT_TYPES:
+        errors.append('Error: Unknown joint type')
+    elif settings['joint'] in ('dogbone', 'tbone') and settings['tool_diameter'] <= 0:
+        errors.append('Error: Tool diameter must be non zero')
+    elif settings['joint'] == 'tslot':
+        hardware = settings['hardware']
+        if hardware['screw_length'] < thickness + hardware['nut_thickness'] * 2:
+            errors.append('Error: Screw too short for T-slot')
+        if hardware['nut_width'] > thickness:
+            errors.append('Error: Nut too wide for material')
+    return errors
+
+
+def get_pieces(box_type, layout, x, y, z):
+    # type: (int, int, float, float, float) -> List[list]
+    # layout format:
+    #   (root_x), (root_y), X_length, Y_length, tabInfo, tabbed, pieceType
+    #
+    # root = (spacing,x,y,z) * values in multiples of dimension of top left corner
+    # eg. (3, 1, 0, 1) means x position = 3*spacing + 1*x dimension + 1*z dimension
+    #
+    # tabInfo= <abcd> 0=holes 1=tabs
+    # tabbed= <abcd> 0=no tabs 1=tabs on this side
+    # (sides: a=top, b=right, c=bottom, d=left)
+    #
+    # pieceType: 1=XY, 2=XZ, 3=ZY
+    # note first two pieces in each set are the x-divider template and y-divider
+    # template respectively
+    if box_type == 2:  # One side open (x,y)
+        if layout == 1:  # Diagrammatic Layout
+            pieces = [[(2, 0, 0, 1), (3, 0, 1, 1), x, z, 0b1010, 0b1101, 2],
+                      [(1, 0, 0, 0), (2, 0, 0, 1), z, y, 0b1111, 0b1110, 3],
+                      [(2, 0, 0, 1), (2, 0, 0, 1), x, y, 0b0000, 0b1111, 1],
+                      [(3, 1, 0, 1), (2, 0, 0, 1), z, y, 0b1111, 0b1011, 3],
+                      [(4, 1, 0, 2), (2, 0, 0, 1), x, y, 0b0000, 0b0000, 1],
+                      [(2, 0, 0, 1), (1, 0, 0, 0), x, z, 0b1010, 0b0111, 2]]
+        elif layout == 2:  # 3 Piece Layout
+            pieces = [[(2, 0, 0, 1), (2, 0, 1, 0), x, z, 0b1010, 0b1101, 2],
+                      [(1, 0, 0, 0), (1, 0, 0, 0), z, y, 0b1111, 0b1110, 3],
+                      [(2, 0, 0, 1), (1, 0, 0, 0), x, y, 0b0000, 0b1111, 1]]
+        elif layout == 3:  # Inline(compact) Layout
+            pieces = [[(5, 2, 0, 2), (1, 0, 0, 0), x, z, 0b1111, 0b1101, 2],
+                      [(3, 2, 0, 0), (1, 0, 0, 0), z, y, 0b0101, 0b1110, 3],
+                      [(4, 2, 0, 1), (1, 0, 0, 0), z, y, 0b0101, 0b1011, 3],
+                      [(2, 1, 0, 0), (1, 0, 0, 0), x, y, 0b0000, 0b1111, 1],
+                      [(6, 3, 0, 2), (1, 0, 0, 0), x, z, 0b1111, 0b0111, 2]]
+        elif layout == 4:  # Diagrammatic Layout with Alternate Tab Arrangement
+            pieces = [[(2, 0, 0, 1), (3, 0, 1, 1), x, z, 0b1001, 0b1101, 2],
+                      [(1, 0, 0, 0), (2, 0, 0, 1), z, y, 0b1100, 0b1110, 3],
+                      [(2, 0, 0, 1), (2, 0, 0, 1), x, y, 0b1100, 0b1111, 1],
+                      [(3, 1, 0, 1), (2, 0, 0, 1), z, y, 0b0110, 0b1011, 3],
+                      [(4, 1, 0, 2), (2, 0, 0, 1), x, y, 0b0110, 0b0000, 1],
+                      [(2, 0, 0, 1), (1, 0, 0, 0), x, z, 0b1100, 0b0111, 2]]
+    elif box_type == 3:  # Two sides open (x,y and x,z)
+        if layout == 1:  # Diagrammatic Layout
+            pieces = [[(2, 0, 0, 1), (1, 0, 0, 0), x, z, 0b1010, 0b0111, 2],
+                      [(1, 0, 0, 0), (2, 0, 0, 1), z, y, 0b1111, 0b1100, 3],
+                      [(2, 0, 0, 1), (2, 0, 0, 1), x, y, 0b0010, 0b1101, 1],
+                      [(3, 1, 0, 1), (2, 0, 0, 1), z, y, 0b1111, 0b1001, 3]]
+        elif layout == 2:  # 3 Piece Layout
+            pieces = [[(2, 0, 0, 1), (1, 0, 0, 0), x, z, 0b1010, 0b0111, 2],
+                      [(1, 0, 0, 0), (2, 0, 0, 1), z, y, 0b1111, 0b1100, 3],
+                      [(2, 0, 0, 1), (2, 0, 0, 1), x, y, 0b0010, 0b1101, 1]]
+        elif layout == 3:  # Inline(compact) Layout
+            pieces = [[(2, 2, 0, 2), (1, 0, 0, 0), x, z, 0b1010, 0b0111, 2],
+                      [(3, 2, 0, 0), (1, 0, 0, 0), z, y, 0b1111, 0b1100, 3],
+                      [(2, 1, 0, 0), (1, 0, 0, 0), x, y, 0b0010, 0b1101, 1],
+                      [(4, 2, 0, 1), (1, 0, 0, 0), z, y, 0b1111, 0b1001, 3]]
+        elif layout == 4:  # Diagrammatic Layout with Alternate Tab Arrangement
+            pieces = [[(2, 0, 0, 1), (1, 0, 0, 0), x, z, 0b1100, 0b0111, 2],
+                      [(1, 0, 0, 0), (2, 0, 0, 1), z, y, 0b1111, 0b1100, 3],
+                      [(2, 0, 0, 1), (2, 0, 0, 1), x, y, 0b1110, 0b1101, 1],
+                      [(3, 1, 0, 1), (2, 0, 0, 1), z, y, 0b0110, 0b1001, 3]]
+    elif box_type == 4:  # Three sides open (x,y, x,z and z,y)
+        if layout == 2:  # 3 Piece Layout
+            pieces = [[(2, 2, 0, 0), (2, 0, 1, 0), x, z, 0b1111, 0b1001, 2],
+                      [(1, 0, 0, 0), (1, 0, 0, 0), z, y, 0b1111, 0b0110, 3],
+                      [(2, 2, 0, 0), (1, 0, 0, 0), x, y, 0b1100, 0b0011, 1]]
+        else:
+            pieces = [[(3, 3, 0, 0), (1, 0, 0, 0), x, z, 0b1110, 0b1001, 2],
+                      [(1, 0, 0, 0), (1, 0, 0, 0), z, y, 0b1111, 0b0110, 3],
+                      [(2, 2, 0, 0), (1, 0, 0, 0), x, y, 0b1100, 0b0011, 1]]
+    elif box_type == 5:  # Opposite ends open (x,y)
+        if layout == 1:  # Diagrammatic Layout
+            pieces = [[(2, 0, 0, 1), (3, 0, 1, 1), x, z, 0b1010, 0b0101, 2],
+                      [(3, 1, 0, 1), (2, 0, 0, 1), z, y, 0b1111, 0b1010, 3],
+                      [(2, 0, 0, 1), (1, 0, 0, 0), x, z, 0b1010, 0b0101, 2],
+                      [(1, 0, 0, 0), (2, 0, 0, 1), z, y, 0b1111, 0b1010, 3]]
+        elif layout == 2:  # 2 Piece Layout
+            pieces = [[(1, 0, 0, 1), (1, 0, 1, 1), x, z, 0b1010, 0b0101, 2],
+                      [(2, 1, 0, 1), (1, 0, 0, 1), z, y, 0b1111, 0b1010, 3]]
+        elif layout == 3:  # Inline(compact) Layout
+            pieces = [[(1, 0, 0, 0), (1, 0, 0, 0), x, z, 0b1010, 0b0101, 2],
+                      [(3, 2, 0, 0), (1, 0, 0, 0), z, y, 0b1111, 0b1010, 3],
+                      [(2, 1, 0, 0), (1, 0, 0, 0), x, z, 0b1010, 0b0101, 2],
+                      [(4, 2, 0, 1), (2, 0, 0, 0), z, y, 0b1111, 0b1010, 3]]
+        elif layout == 4:  # Diagrammatic Layout with Alternate Tab Arrangement
+            pieces = [[(2, 0, 0, 1), (3, 0, 1, 1), x, z, 0b1011, 0b0101, 2],
+                      [(3, 1, 0, 1), (2, 0, 0, 1), z, y, 0b0111, 0b1010, 3],
+                      [(2, 0, 0, 1), (1, 0, 0, 0), x, z, 0b1110, 0b0101, 2],
+                      [(1, 0, 0, 0), (2, 0, 0, 1), z, y, 0b1101, 0b1010, 3]]
+    elif box_type == 6:  # 2 panels jointed (x,y and z,y joined along y)
+        pieces = [[(1, 0, 0, 0), (1, 0, 0, 0), x, y, 0b1011, 0b0100, 1],
+                  [(2, 1, 0, 0), (1, 0, 0, 0), z, y, 0b1111, 0b0001, 3]]
+    else:  # Fully enclosed
+        if layout == 1:  # Diagrammatic Layout
+            pieces = [[(2, 0, 0, 1), (3, 0, 1, 1), x, z, 0b1010, 0b1111, 2],
+                      [(1, 0, 0, 0), (2, 0, 0, 1), z, y, 0b1111, 0b1111, 3],
+                      [(2, 0, 0, 1), (2, 0, 0, 1), x, y, 0b0000, 0b1111, 1],
+                      [(3, 1, 0, 1), (2, 0, 0, 1), z, y, 0b1111, 0b1111, 3],
+                      [(4, 1, 0, 2), (2, 0, 0, 1), x, y, 0b0000, 0b1111, 1],
+                      [(2, 0, 0, 1), (1, 0, 0, 0), x, z, 0b1010, 0b1111, 2]]
+        elif layout == 2:  # 3 Piece Layout
+            pieces = [[(2, 0, 0, 1), (2, 0, 1, 0), x, z, 0b1010, 0b1111, 2],
+                      [(1, 0, 0, 0), (1, 0, 0, 0), z, y, 0b1111, 0b1111, 3],
+                      [(2, 0, 0, 1), (1, 0, 0, 0), x, y, 0b0000, 0b1111, 1]]
+        elif layout == 3:  # Inline(compact) Layout
+            pieces = [[(5, 2, 0, 2), (1, 0, 0, 0), x, z, 0b1111, 0b1111, 2],
+                      [(3, 2, 0, 0), (1, 0, 0, 0), z, y, 0b0101, 0b1111, 3],
+                      [(6, 3, 0, 2), (1, 0, 0, 0), x, z, 0b1111, 0b1111, 2],
+                      [(4, 2, 0, 1), (1, 0, 0, 0), z, y, 0b0101, 0b1111, 3],
+                      [(2, 1, 0, 0), (1, 0, 0, 0), x, y, 0b0000, 0b1111, 1],
+                      [(1, 0, 0, 0), (1, 0, 0, 0), x, y, 0b0000, 0b1111, 1]]
+        elif layout == 4:  # Diagrammatic Layout with Alternate Tab Arrangement
+            pieces = [[(2, 0, 0, 1), (3, 0, 1, 1), x, z, 0b1001, 0b1111, 2],
+                      [(1, 0, 0, 0), (2, 0, 0, 1), z, y, 0b1100, 0b1111, 3],
+                      [(2, 0, 0, 1), (2, 0, 0, 1), x, y, 0b1100, 0b1111, 1],
+                      [(3, 1, 0, 1), (2, 0, 0, 1), z, y, 0b0110, 0b1111, 3],
+                      [(4, 1, 0, 2), (2, 0, 0, 1), x, y, 0b0110, 0b1111, 1],
+                      [(2, 0, 0, 1), (1, 0, 0, 0), x, z, 0b1100, 0b1111, 2]]
+    return pieces
+
+
+def panel_faces(box_type, layout):
+    # type: (int, int) -> List[Tuple[str, ...]]
+    # the faces of the box the pieces from get_pieces() are cut for, in the
+    # same order: 'floor' and 'lid' (XY), 'front' and 'back' (XZ), 'left' and
+    # 'right' (ZY), each the way round it is drawn in the Diagrammatic Layout
+    # (see FACE_MATES).  A piece that is cut twice, in the 3 and 2 piece
+    # layouts, names both faces; the second is the piece turned over.
+    if box_type == 2:  # One side open (x,y)
+        if layout == 2:  # 3 Piece Layout
+            faces = [('front', 'back'), ('left', 'right'), ('floor',)]
+        elif layout == 3:  # Inline(compact) Layout
+            faces = [('front',), ('left',), ('right',), ('floor',), ('back',)]
+        else:  # Diagrammatic Layouts
+            faces = [('front',), ('left',), ('floor',), ('right',), ('lid',), ('back',)]
+    elif box_type == 3:  # Two sides open (x,y and x,z)
+        if layout == 2:  # 3 Piece Layout
+            faces = [('back',), ('left', 'right'), ('floor',)]
         else:
-            DEFAULT_LINE_THICKNESS = 1
-
-        if schroff:
-            hp = self.options.hp
-            rows = self.options.rows
-            rail_height = self.unittouu(str(self.options.rail_height) + unit)
-            row_centre_spacing = self.unittouu(str(122.5) + unit)
-            row_spacing = self.unittouu(str(self.options.row_spacing) + unit)
-            rail_mount_depth = self.unittouu(str(self.options.rail_mount_depth) + unit)
-            rail_mount_centre_offset = self.unittouu(
-                str(self.options.rail_mount_centre_offset) + unit)
-            rail_mount_radius = self.unittouu(str(2.5) + unit)
-
-        # minimally different behaviour for schroffmaker.inx vs. boxmaker.inx
-        # essentially schroffmaker.inx is just an alternate interface with different
-        # default settings, some options removed, and a tiny amount of extra logic
-        if schroff:
-            # schroffmaker.inx
-            x = self.unittouu(str(self.options.hp * 5.08) + unit)
-            # 122.5mm vertical distance between mounting hole centres of 3U Schroff panels
-            row_height = rows * (row_centre_spacing + rail_height)
-            # rail spacing in between rows but never between rows and case panels
-            row_spacing_total = (rows - 1) * row_spacing
-            y = row_height + row_spacing_total
+            faces = [('back',), ('left',), ('floor',), ('right',)]
+    elif box_type == 4:  # Three sides open (x,y, x,z and z,y)
+        faces = [('front',), ('left',), ('floor',)]
+    elif box_type == 5:  # Opposite ends open (x,y)
+        if layout == 2:  # 2 Piece Layout
+            faces = [('front', 'back'), ('left', 'right')]
+        elif layout == 3:  # Inline(compact) Layout
+            faces = [('front',), ('left',), ('back',), ('right',)]
+        else:  # Diagrammatic Layouts
+            faces = [('front',), ('right',), ('back',), ('left',)]
+    elif box_type == 6:  # 2 panels jointed (x,y and z,y joined along y)
+        faces = [('floor',), ('right',)]
+    else:  # Fully enclosed
+        if layout == 2:  # 3 Piece Layout
+            faces = [('front', 'back'), ('left', 'right'), ('floor', 'lid')]
+        elif layout == 3:  # Inline(compact) Layout
+            faces = [('front',), ('left',), ('back',), ('right',), ('floor',), ('lid',)]
+        else:  # Diagrammatic Layouts
+            faces = [('front',), ('left',), ('floor',), ('right',), ('lid',), ('back',)]
+    return faces
+
+
+def decode_tabs(piece):
+    # type: (list) -> Tuple[int, int, int, int, int, int, int, int]
+    """Extract the tab status and tabbed flag of each side (a, b, c, d) of a piece."""
+    tabs = piece[4]
+    tabbed = piece[5]
+    return (tabs >> 3 & 1, tabs >> 2 & 1, tabs >> 1 & 1, tabs & 1,
+            tabbed >> 3 & 1, tabbed >> 2 & 1, tabbed >> 1 & 1, tabbed & 1)
+
+
+def hinge_radius(settings):
+    # type: (Dict[str, Any]) -> float
+    """Outside radius of the vertical corners of a box with living hinges.
+
+    Each wall's hinge bands bend it half way round the corner at each end, where
+    it butts against the next wall, so a band is as wide as a 45 degree arc
+    through the middle of the material.
+    """
+    return 4 * settings['hinge_width'] / math.pi + settings['thickness'] / 2
+
+
+def hinge_margins(settings, piece_type, wall=False):
+    # type: (Dict[str, Any], int, bool) -> Tuple[float, float]
+    """Tab margins for the sides of a piece along its x and y (see side()).
+
+    With living hinges, the sides running along the box's length or width only
+    have tabs along the straight part between the rounded corners: that is the
+    corner radius from each end of the floor, lid and dividers, and the hinge
+    band from each end of a (shortened) wall.
+    """
+    if not settings['hinge']:
+        return 0, 0
+    margin = settings['hinge_width'] if wall else hinge_radius(settings)
+    return (margin if piece_type != 3 else 0,  # 3 is a ZY piece: x is along z
+            margin if piece_type != 2 else 0)  # 2 is an XZ piece: y is along z
+
+
+def divider_crossings(count, spacing, thickness, inset=0):
+    # type: (int, float, float, float) -> List[Tuple[float, float]]
+    """Where `count` dividers `spacing` apart cross a side along the box's
+    length or width, as (from, to) distances along it (see side()'s keep_clear).
+
+    The dividers are evenly spaced, so this is the same from either end.  A
+    side that starts `inset` in from the box's outside is measured from there.
+    """
+    return [(m * spacing - inset, m * spacing + thickness - inset)
+            for m in range(1, int(count) + 1)]
+
+
+def round_corners(sides, rect, radius, insets, segments=8):
+    # type: (List[str], Tuple[float, float, float, float], float, List[float], int) -> List[str]
+    """Round the corners of a panel's sides (see panel_sides()) to the outside
+    `radius` of a box with living hinges, as its floor and lid are.
+
+    `insets` are how far the line of each side is in from the edge of `rect`.
+    Each side then starts with the arc of the corner before it.
+    """
+    x_, y_, dx, dy = rect
+    centres = [(x_ + radius, y_ + radius), (x_ + dx - radius, y_ + radius),
+               (x_ + dx - radius, y_ + dy - radius), (x_ + radius, y_ + dy - radius)]
+    arcs = []
+    for k, (cx, cy) in enumerate(centres):  # corner k is before side k
+        rx = radius - insets[1 if k in (1, 2) else 3]
+        ry = radius - insets[0 if k < 2 else 2]
+        start = math.pi * (1 + k / 2.0)
+        arcs.append([(cx + rx * math.cos(start + math.pi / 2 * i / segments),
+                      cy + ry * math.sin(start + math.pi / 2 * i / segments))
+                     for i in range(segments + 1)])
+    rounded = []
+    for k, d in enumerate(sides):
+        body = d.split(' ', 2)[2]  # drop the side's corners
+        body = body[:body.rindex('L ')]
+        rounded.append('M {},{} '.format(*arcs[k][0]) +
+                       ''.join(['L {},{} '.format(*p) for p in arcs[k][1:]]) +
+                       body + 'L {},{} '.format(*arcs[(k + 1) % 4][0]))
+    return rounded
+
+
+def hinge_slits(left, top, band, run, vertical, settings):
+    # type: (float, float, float, float, bool, Dict[str, Any]) -> Any
+    """Staggered kerf-bend slits filling a band, as an N x 4 array of x0, y0, x1, y1.
+
+    The band has its top left corner at (left, top), is `band` wide across the
+    slits and `run` long along them; `vertical` slits run down the page.
+    """
+    spacing = settings['slit_spacing']
+    length = settings['slit_length']
+    bridge = settings['hinge_bridge']
+    period = length + bridge
+
+    # columns are at least half a spacing from the edges of the band, one of
+    # which is the end of the wall
+    cols = np.arange(max(int(band // spacing), 1))
+    across = (band - (len(cols) - 1) * spacing) / 2 + cols * spacing
+    rows = np.arange(-1, int(run // period) + 2)
+    # every other column of slits is offset by half a period
+    starts = (cols % 2)[:, np.newaxis] * (period / 2) + rows * period
+    v0 = np.clip(starts, 0, run)
+    v1 = np.clip(starts + length, 0, run)
+    keep = v1 - v0 > bridge  # drop stubs cut off by the ends of the band
+    across = np.broadcast_to(across[:, np.newaxis], starts.shape)[keep]
+    v0 = v0[keep]
+    v1 = v1[keep]
+    if vertical:
+        return np.column_stack((left + across, top + v0, left + across, top + v1))
+    return np.column_stack((left + v0, top + across, left + v1, top + across))
+
+
+def hinge_path(settings, x_, y_, dx, dy, piece_type):
+    # type: (Dict[str, Any], float, float, float, float, int) -> str
+    """Single compound path of the living hinges of an XZ (2) or ZY (3) wall.
+
+    The hinge bands are at the ends of the wall, clear of the floor and lid.
+    """
+    load_numpy()  # in a worker process it may not be loaded yet
+    t = settings['thickness']
+    width = settings['hinge_width']
+    bridge = settings['hinge_bridge']
+    if piece_type == 2:  # the ends of the wall are the left and right sides
+        run = dy - 2 * (t + bridge)
+        slits = np.concatenate(
+            (hinge_slits(x_, y_ + t + bridge, width, run, True, settings),
+             hinge_slits(x_ + dx - width, y_ + t + bridge, width, run, True, settings)))
+    else:  # the ends of the wall are the top and bottom sides
+        run = dx - 2 * (t + bridge)
+        slits = np.concatenate(
+            (hinge_slits(x_ + t + bridge, y_, width, run, False, settings),
+             hinge_slits(x_ + t + bridge, y_ + dy - width, width, run, False, settings)))
+    return ('M %r,%r L %r,%r ' * len(slits)) % tuple(slits.ravel().tolist())
+
+
+class Piece(namedtuple('Piece', 'role index piece_type rect outline holes')):
+    """One generated piece of a box.
+
+    `role` is 'panel', 'x_divider' or 'y_divider' and `index` its number within
+    that role.  `rect` is the (x, y, width, height) the piece is laid out in
+    before its tabs are cut, `outline` holds the four side paths, in order
+    a, b, c, d, and `holes` the ('circle', r, cx, cy) and ('path', d) items cut
+    inside it.
+    """
+    __slots__ = ()
+
+    @property
+    def bbox(self):
+        # type: () -> Tuple[float, float, float, float]
+        return measure([('path', d) for d in self.outline])[:4]
+
+    def items(self):
+        # type: () -> List[tuple]
+        """The piece's holes, then its outline, as drawing items."""
+        return self.holes + [('path', d) for d in self.outline]
+
+
+def panel_piece(settings, idx, piece):
+    # type: (Dict[str, Any], int, list) -> Piece
+    """Generate outer panel `idx` of the box from its row in the layout table."""
+    x, y, z = settings['x'], settings['y'], settings['z']
+    thickness = settings['thickness']
+    spacing = settings['spacing']
+    joint = box_joint(settings)
+    items = []
+    holes = []
+
+    (xs, xx, xy, xz) = piece[0]
+    (ys, yx, yy, yz) = piece[1]
+    x_ = xs * spacing + xx * x + xy * y + xz * z  # root x co-ord for piece
+    y_ = ys * spacing + yx * x + yy * y + yz * z  # root y co-ord for piece
+    dx = piece[2]
+    dy = piece[3]
+    a, b, c, d, a_tabs, b_tabs, c_tabs, d_tabs = decode_tabs(piece)
+    wall = 1 if piece[6] > 1 else 0
+    rail_holes = 1 if piece[6] == 3 else 0
+
+    if settings['schroff'] and rail_holes:
+        rows = settings['rows']
+        rail_height = settings['rail_height']
+        row_centre_spacing = settings['row_centre_spacing']
+        row_spacing = settings['row_spacing']
+        rail_mount_centre_offset = settings['rail_mount_centre_offset']
+        rail_mount_radius = settings['rail_mount_radius']
+        log("rail holes enabled on piece {} at ({}, {})".format(idx,
+                                                                x_ + thickness,
+                                                                y_ + thickness))
+        log("abcd = ({},{},{},{})".format(a, b, c, d))
+        log("dxdy = ({},{})".format(dx, dy))
+        rhx_offset = settings['rail_mount_depth'] + thickness
+        if idx == 1:
+            rhx = x_ + rhx_offset
+        elif idx == 3:
+            rhx = x_ - rhx_offset + dx
+        else:
+            rhx = 0
+        log("rhx_offset = {}, rhx= {}".format(rhx_offset, rhx))
+        ry_start = y_ + (rail_height / 2) + thickness
+        if rows == 1:
+            log("just one row this time, ry_start = {}".format(ry_start))
+            rh1y = ry_start + rail_mount_centre_offset
+            rh2y = rh1y + (row_centre_spacing - rail_mount_centre_offset)
+            items.append(('circle', rail_mount_radius, rhx, rh1y))
+            items.append(('circle', rail_mount_radius, rhx, rh2y))
+        else:
+            for n in range(0, rows):
+                log("drawing row {}, ry_start = {}".format(n + 1, ry_start))
+                # if holes are offset (eg. Vector T-strut rails), they should
+                # be offset
+                # toward each other, ie. toward the centreline of the Schroff row
+                rh1y = ry_start + rail_mount_centre_offset
+                rh2y = rh1y + row_centre_spacing - rail_mount_centre_offset
+                items.append(('circle', rail_mount_radius, rhx, rh1y))
+                items.append(('circle', rail_mount_radius, rhx, rh2y))
+                ry_start += row_centre_spacing + row_spacing + rail_height
+
+    # generate the sides of the piece
+    tabs = (a, b, c, d, a_tabs, b_tabs, c_tabs, d_tabs)
+    rect = (x_, y_, dx, dy)
+    if settings['hinge'] and wall:
+        # the divider holes stay where they are in a square cornered wall, whose
+        # ends are then cut back to bend round the corners as hinges, butting
+        # against the next wall half way round
+        panel_sides(settings, joint, piece[6], rect, tabs, holes, outline=False)
+        inset = hinge_radius(settings) - settings['hinge_width']
+        if piece[6] == 2:  # the ends of the wall are the left and right sides
+            x_, dx = x_ + inset, dx - 2 * inset
+            tabs = (a, 0, c, 0, a_tabs, 0, c_tabs, 0)
+        else:  # the ends of the wall are the top and bottom sides
+            y_, dy = y_ + inset, dy - 2 * inset
+            tabs = (0, b, 0, d, 0, b_tabs, 0, d_tabs)
+        rect = (x_, y_, dx, dy)
+        outline = panel_sides(settings, joint, piece[6], rect, tabs, holes, shortened=True)
+    else:
+        outline = panel_sides(settings, joint, piece[6], rect, tabs, holes)
+        if settings['hinge']:  # the floor and lid are rounded to match the walls
+            outline = round_corners(outline, rect, hinge_radius(settings),
+                                    [flag * thickness for flag in (a, b, c, d)])
+
+    items.extend(('path', h) for h in holes)
+    if settings['hinge'] and wall:
+        items.append(('path', hinge_path(settings, x_, y_, dx, dy, piece[6])))
+    return Piece('panel', idx, piece[6], rect, outline, items)
+
+
+def panel_sides(settings, joint, piece_type, rect, tabs, holes, shortened=False,
+                outline=True):
+    # type: (Dict[str, Any], FingerJoint, int, Tuple[float, float, float, float], Tuple[int, int, int, int, int, int, int, int], List[str], bool, bool) -> List[str]
+    """Generate the four sides of an outer panel laid out in `rect`, clockwise
+    from the top.
+
+    `tabs` are the tab status and tabbed flags of the sides (see decode_tabs()),
+    and divider holes are appended to `holes`.  `shortened` is as for the `wall`
+    of hinge_margins() and `outline` as for side().
+    """
+    x, y = settings['x'], settings['y']
+    thickness = settings['thickness']
+    div_x, div_y = settings['div_x'], settings['div_y']
+    key_div_walls = settings['key_div_walls']
+    key_div_floor = settings['key_div_floor']
+    div_offset = settings['div_offset']
+    x_, y_, dx, dy = rect
+    a, b, c, d, a_tabs, b_tabs, c_tabs, d_tabs = tabs
+    x_spacing = (x - thickness) / (div_y + 1)
+    y_spacing = (y - thickness) / (div_x + 1)
+    x_holes = 1 if piece_type < 3 else 0   # 3 is a YZ piece
+    y_holes = 1 if piece_type != 2 else 0  # 2 is an XZ piece
+    wall = 1 if piece_type > 1 else 0
+    floor = 1 if piece_type == 1 else 0    # 1 is an XY piece
+    margin_x, margin_y = hinge_margins(settings, piece_type, shortened)
+    inset = hinge_radius(settings) - settings['hinge_width'] if shortened else 0
+    clear_x = divider_crossings(div_y * x_holes, x_spacing, thickness, inset)
+    clear_y = divider_crossings(div_x * y_holes, y_spacing, thickness, inset)
+
+    side_a = side(settings, joint, root_coord=(x_, y_),
+                  start_offset_coord=(d, a),
+                  end_offset_coord=(-b, a),
+                  tab_vec=a_tabs * (-thickness if a else thickness),
+                  length=dx,
+                  direction=(1, 0),
+                  is_tab=a,
+                  is_divider=False,
+                  num_dividers=(key_div_floor | wall) * (
+                          key_div_walls | floor) * div_x * y_holes * a_tabs,
+                  div_spacing=y_spacing,
+                  div_offset=div_offset,
+                  holes=holes,
+                  margin=margin_x,
+                  outline=outline,
+                  keep_clear=clear_x)
+
+    side_b = side(settings, joint, root_coord=(x_ + dx, y_),
+                  start_offset_coord=(-b, a),
+                  end_offset_coord=(-b, -c),
+                  tab_vec=b_tabs * (thickness if b else -thickness),
+                  length=dy,
+                  direction=(0, 1),
+                  is_tab=b,
+                  is_divider=False,
+                  num_dividers=(key_div_floor | wall) * (
+                          key_div_walls | floor) * div_y * x_holes * b_tabs,
+                  div_spacing=x_spacing,
+                  div_offset=div_offset,
+                  holes=holes,
+                  margin=margin_y,
+                  outline=outline,
+                  keep_clear=clear_y)
+
+    if a_tabs:
+        side_c = side(settings, joint, root_coord=(x_ + dx, y_ + dy),
+                      start_offset_coord=(-b, -c),
+                      end_offset_coord=(d, -c),
+                      tab_vec=c_tabs * (thickness if c else -thickness),
+                      length=dx,
+                      direction=(-1, 0),
+                      is_tab=c,
+                      is_divider=False,
+                      num_dividers=0,
+                      div_spacing=0,
+                      div_offset=div_offset,
+                      holes=holes,
+                      margin=margin_x,
+                      outline=outline,
+                      keep_clear=clear_x)
+    else:
+        side_c = side(settings, joint, root_coord=(x_ + dx, y_ + dy),
+                      start_offset_coord=(-b, -c),
+                      end_offset_coord=(d, -c),
+                      tab_vec=c_tabs * (thickness if c else -thickness),
+                      length=dx,
+                      direction=(-1, 0),
+                      is_tab=c,
+                      is_divider=False,
+                      num_dividers=(key_div_floor | wall) * (
+                              key_div_walls | floor) * div_x * y_holes *
+                                   c_tabs,
+                      div_spacing=y_spacing,
+                      div_offset=div_offset,
+                      holes=holes,
+                      margin=margin_x,
+                      outline=outline,
+                      keep_clear=clear_x)
+
+    if b_tabs:
+        side_d = side(settings, joint, root_coord=(x_, y_ + dy),
+                      start_offset_coord=(d, -c),
+                      end_offset_coord=(d, a),
+                      tab_vec=d_tabs * (-thickness if d else thickness),
+                      length=dy,
+                      direction=(0, -1),
+                      is_tab=d,
+                      is_divider=False,
+                      num_dividers=0,
+                      div_spacing=0,
+                      div_offset=div_offset,
+                      holes=holes,
+                      margin=margin_y,
+                      outline=outline,
+                      keep_clear=clear_y)
+    else:
+        side_d = side(settings, joint, root_coord=(x_, y_ + dy),
+                      start_offset_coord=(d, -c),
+                      end_offset_coord=(d, a),
+                      tab_vec=d_tabs * (-thickness if d else thickness),
+                      length=dy,
+                      direction=(0, -1),
+                      is_tab=d,
+                      is_divider=False,
+                      num_dividers=(key_div_floor | wall) * (
+                              key_div_walls | floor) * div_y * x_holes *
+                                   d_tabs,
+                      div_spacing=x_spacing,
+                      div_offset=div_offset,
+                      holes=holes,
+                      margin=margin_y,
+                      outline=outline,
+                      keep_clear=clear_y)
+
+    return [side_a, side_b, side_c, side_d]
+
+
+def divider_piece(settings, piece, role, n):
+    # type: (Dict[str, Any], list, str, int) -> Piece
+    """Generate divider `n` of one set, using `piece` as the divider template.
+
+    `role` is 'x_divider' (template is the first piece) or 'y_divider'
+    (template is the second piece).
+    """
+    x, y, z = settings['x'], settings['y'], settings['z']
+    thickness = settings['thickness']
+    div_x, div_y = settings['div_x'], settings['div_y']
+    key_div_walls = settings['key_div_walls']
+    key_div_floor = settings['key_div_floor']
+    spacing = settings['spacing']
+    joint = box_joint(settings)
+    holes = []
+
+    dx = piece[2]
+    dy = piece[3]
+    a, b, c, d, a_tabs, b_tabs, c_tabs, d_tabs = decode_tabs(piece)
+    x_spacing = (x - thickness) / (div_y + 1)
+    y_spacing = (y - thickness) / (div_x + 1)
+    x_holes = 1 if piece[6] < 3 else 0   # 3 is a YZ piece
+    y_holes = 1 if piece[6] != 2 else 0  # 2 is an XZ piece
+    margin_x, margin_y = hinge_margins(settings, piece[6])
+    clear_x = divider_crossings(div_y * x_holes, x_spacing, thickness)
+    clear_y = divider_crossings(div_x * y_holes, y_spacing, thickness)
+
+    if role == 'x_divider':
+        div_offset = settings['div_offset']
+        if not key_div_walls:
+            a = 1
+            b = 1
+            c = 1
+            d = 1
+            a_tabs = 0
+            b_tabs = 0
+            c_tabs = 0
+            d_tabs = 0
+        y_ = 4 * spacing + 1 * y + 2 * z  # root y co-ord for piece
+        x_ = n * (spacing + x)  # root x co-ord for piece
+
+        side_a = side(settings, joint, root_coord=(x_, y_),
+                      start_offset_coord=(d, a),
+                      end_offset_coord=(-b, a),
+                      tab_vec=key_div_floor * a_tabs * (
+                          -thickness if a else thickness),
+                      length=dx,
+                      direction=(1, 0),
+                      is_tab=a,
+                      is_divider=True,
+                      num_dividers=0,
+                      div_spacing=0,
+                      div_offset=div_offset,
+                      holes=holes,
+                      margin=margin_x,
+                      keep_clear=clear_x)
+
+        side_b = side(settings, joint, root_coord=(x_ + dx, y_),
+                      start_offset_coord=(-b, a),
+                      end_offset_coord=(-b, -c),
+                      tab_vec=key_div_walls * b_tabs * (
+                          thickness if key_div_walls * b else -thickness),
+                      length=dy,
+                      direction=(0, 1),
+                      is_tab=b,
+                      is_divider=True,
+                      num_dividers=div_y * x_holes,
+                      div_spacing=x_spacing,
+                      div_offset=div_offset,
+                      holes=holes,
+                      margin=margin_y,
+                      keep_clear=clear_y)
+
+        side_c = side(settings, joint, root_coord=(x_ + dx, y_ + dy),
+                      start_offset_coord=(-b, -c),
+                      end_offset_coord=(d, -c),
+                      tab_vec=key_div_floor * c_tabs * (
+                          thickness if c else -thickness),
+                      length=dx,
+                      direction=(-1, 0),
+                      is_tab=c,
+                      is_divider=True,
+                      num_dividers=0,
+                      div_spacing=0,
+                      div_offset=div_offset,
+                      holes=holes,
+                      margin=margin_x,
+                      keep_clear=clear_x)
+
+        side_d = side(settings, joint, root_coord=(x_, y_ + dy),
+                      start_offset_coord=(d, -c),
+                      end_offset_coord=(d, a),
+                      tab_vec=key_div_walls * d_tabs * (
+                          -thickness if d else thickness),
+                      length=dy,
+                      direction=(0, -1),
+                      is_tab=d,
+                      is_divider=True,
+                      num_dividers=0,
+                      div_spacing=0,
+                      div_offset=div_offset,
+                      holes=holes,
+                      margin=margin_y,
+                      keep_clear=clear_y)
+
+    else:
+        y_ = 5 * spacing + 1 * y + 3 * z  # root y co-ord for piece
+        x_ = n * (spacing + z)  # root x co-ord for piece
+
+        side_a = side(settings, joint, root_coord=(x_, y_),
+                      start_offset_coord=(d, a),
+                      end_offset_coord=(-b, a),
+                      tab_vec=key_div_walls * a_tabs * (
+                          -thickness if a else thickness),
+                      length=dx,
+                      direction=(1, 0),
+                      is_tab=a,
+                      is_divider=True,
+                      num_dividers=div_x * y_holes,
+                      div_spacing=y_spacing,
+                      div_offset=thickness,
+                      holes=holes,
+                      margin=margin_x,
+                      keep_clear=clear_x)
+
+        side_b = side(settings, joint, root_coord=(x_ + dx, y_),
+                      start_offset_coord=(-b, a),
+                      end_offset_coord=(-b, -c),
+                      tab_vec=key_div_floor * b_tabs * (
+                          thickness if b else -thickness),
+                      length=dy,
+                      direction=(0, 1),
+                      is_tab=b,
+                      is_divider=True,
+                      num_dividers=0,
+                      div_spacing=0,
+                      div_offset=thickness,
+                      holes=holes,
+                      margin=margin_y,
+                      keep_clear=clear_y)
+
+        side_c = side(settings, joint, root_coord=(x_ + dx, y_ + dy),
+                      start_offset_coord=(-b, -c),
+                      end_offset_coord=(d, -c),
+                      tab_vec=key_div_walls * c_tabs * (
+                          thickness if c else -thickness),
+                      length=dx,
+                      direction=(-1, 0),
+                      is_tab=c,
+                      is_divider=True,
+                      num_dividers=0,
+                      div_spacing=0,
+                      div_offset=thickness,
+                      holes=holes,
+                      margin=margin_x,
+                      keep_clear=clear_x)
+
+        side_d = side(settings, joint, root_coord=(x_, y_ + dy),
+                      start_offset_coord=(d, -c),
+                      end_offset_coord=(d, a),
+                      tab_vec=key_div_floor * d_tabs * (
+                          -thickness if d else thickness),
+                      length=dy,
+                      direction=(0, -1),
+                      is_tab=d,
+                      is_divider=True,
+                      num_dividers=0,
+                      div_spacing=0,
+                      div_offset=thickness,
+                      holes=holes,
+                      margin=margin_y,
+                      keep_clear=clear_y)
+
+    return Piece(role, n, piece[6], (x_, y_, dx, dy),
+                 [side_a, side_b, side_c, side_d], [('path', h) for h in holes])
+
+
+def box_jobs(settings, pieces):
+    # type: (Dict[str, Any], List[list]) -> List[tuple]
+    """Split a box into independent piece jobs, in drawing order.
+
+    Each outer panel is one job; the x-divider set follows the first panel and
+    the y-divider set follows the second, as they are built from those templates.
+    """
+    jobs = []
+    for idx, piece in enumerate(pieces):
+        jobs.append(('panel', settings, idx, piece))
+        if idx == 0 and settings['div_x']:
+            jobs.append(('x_dividers', settings, idx, piece))
+        elif idx == 1 and settings['div_y']:
+            jobs.append(('y_dividers', settings, idx, piece))
+    return jobs
+
+
+def generate_job(job):
+    # type: (tuple) -> List[Piece]
+    """Generate the pieces of one job: an outer panel, or a whole divider set."""
+    kind, settings, idx, piece = job
+    if kind == 'panel':
+        return [panel_piece(settings, idx, piece)]
+    if kind == 'x_dividers':
+        role, count = 'x_divider', settings['div_x']
+    else:
+        role, count = 'y_divider', settings['div_y']
+    return [divider_piece(settings, piece, role, n) for n in range(0, count)]
+
+
+def iter_pieces(settings, select=None):
+    # type: (Dict[str, Any], Optional[Callable[[str, int, int], bool]]) -> Iterator[Piece]
+    """Yield the pieces of a box one at a time, in drawing order.
+
+    Nothing is generated until it is asked for, so stopping early skips the
+    remaining pieces.  `select(role, index, piece_type)` can return False to
+    skip a piece without generating it.
+    """
+    pieces = get_pieces(settings['box_type'], settings['layout'],
+                        settings['x'], settings['y'], settings['z'])
+    for idx, piece in enumerate(pieces):
+        if select is None or select('panel', idx, piece[6]):
+            yield panel_piece(settings, idx, piece)
+        if idx == 0:
+            role, count = 'x_divider', settings['div_x']
+        elif idx == 1:
+            role, count = 'y_divider', settings['div_y']
         else:
-            # boxmaker.inx
-            x = self.unittouu(str(self.options.length) + unit)
-            y = self.unittouu(str(self.options.width) + unit)
-
-        z = self.unittouu(str(self.options.height) + unit)
-        thickness = self.unittouu(str(self.options.thickness) + unit)
-        nom_tab = self.unittouu(str(self.options.tab) + unit)
-        equal_tabs = self.options.equal
-        kerf = self.unittouu(str(self.options.kerf) + unit)
-        clearance = self.unittouu(str(self.options.clearance) + unit)
-        layout = self.options.style
-        spacing = self.unittouu(str(self.options.spacing) + unit)
-        box_type = self.options.boxtype
-        div_x = self.options.div_l
-        div_y = self.options.div_w
-        key_div_walls = 0 if self.options.keydiv == 3 or self.options.keydiv == 1 else 1
-        key_div_floor = 0 if self.options.keydiv == 3 or self.options.keydiv == 2 else 1
-        div_offset = key_div_walls * thickness
-
-        if inside:  # if inside dimension selected correct values to outside dimension
-            x += thickness * 2
-            y += thickness * 2
-            z += thickness * 2
-
-        correction = kerf - clearance
-
-        # check input values mainly to avoid python errors
-        # TODO restrict values to *correct* solutions
-        # TODO restrict divisions to logical values
-        error = 0
-
-        if min(x, y, z) == 0:
-            inkex.errormsg('Error: Dimensions must be non zero')
-            error = 1
-        if max(x, y, z) > max(width_doc, height_doc) * 10:  # crude test
-            inkex.errormsg('Error: Dimensions Too Large')
-            error = 1
-        if min(x, y, z) < 3 * nom_tab:
-            inkex.errormsg('Error: Tab size too large')
-            error = 1
-        if nom_tab < thickness:
-            inkex.errormsg('Error: Tab size too small')
-            error = 1
-        if thickness == 0:
-            inkex.errormsg('Error: Thickness is zero')
-            error = 1
-        if thickness > min(x, y, z) / 3:  # crude test
-            inkex.errormsg('Error: Material too thick')
-            error = 1
-        if correction > min(x, y, z) / 3:  # crude test
-            inkex.errormsg('Error: Kerf/Clearance too large')
-            error = 1
-        if spacing > max(x, y, z) * 10:  # crude test
-            inkex.errormsg('Error: Spacing too large')
-            error = 1
-        if spacing < kerf:
-            inkex.errormsg('Error: Spacing too small')
-            error = 1
-
-        if error:
-            exit()
-
-        # layout format:
-        #   (root_x), (root_y), X_length, Y_length, tabInfo, tabbed, pieceType
-        #
-        # root = (spacing,x,y,z) * values in multiples of dimension of top left corner
-        # eg. (3, 1, 0, 1) means x position = 3*spacing + 1*x dimension + 1*z dimension
-        #
-        # tabInfo= <abcd> 0=holes 1=tabs
-        # tabbed= <abcd> 0=no tabs 1=tabs on this side
-        # (sides: a=top, b=right, c=bottom, d=left)
-        #
-        # pieceType: 1=XY, 2=XZ, 3=ZY
-        # note first two pieces in each set are the x-divider template and y-divider
-        # template respectively
-        if box_type == 2:  # One side open (x,y)
-            if layout == 1:  # Diagrammatic Layout
-                pieces = [[(2, 0, 0, 1), (3, 0, 1, 1), x, z, 0b1010, 0b1101, 2],
-                          [(1, 0, 0, 0), (2, 0, 0, 1), z, y, 0b1111, 0b1110, 3],
-                          [(2, 0, 0, 1), (2, 0, 0, 1), x, y, 0b0000, 0b1111, 1],
-                          [(3, 1, 0, 1), (2, 0, 0, 1), z, y, 0b1111, 0b1011, 3],
-                          [(4, 1, 0, 2), (2, 0, 0, 1), x, y, 0b0000, 0b0000, 1],
-                          [(2, 0, 0, 1), (1, 0, 0, 0), x, z, 0b1010, 0b0111, 2]]
-            elif layout == 2:  # 3 Piece Layout
-                pieces = [[(2, 0, 0, 1), (2, 0, 1, 0), x, z, 0b1010, 0b1101, 2],
-                          [(1, 0, 0, 0), (1, 0, 0, 0), z, y, 0b1111, 0b1110, 3],
-                          [(2, 0, 0, 1), (1, 0, 0, 0), x, y, 0b0000, 0b1111, 1]]
-            elif layout == 3:  # Inline(compact) Layout
-                pieces = [[(5, 2, 0, 2), (1, 0, 0, 0), x, z, 0b1111, 0b1101, 2],
-                          [(3, 2, 0, 0), (1, 0, 0, 0), z, y, 0b0101, 0b1110, 3],
-                          [(4, 2, 0, 1), (1, 0, 0, 0), z, y, 0b0101, 0b1011, 3],
-                          [(2, 1, 0, 0), (1, 0, 0, 0), x, y, 0b0000, 0b1111, 1],
-                          [(6, 3, 0, 2), (1, 0, 0, 0), x, z, 0b1111, 0b0111, 2]]
-            elif layout == 4:  # Diagrammatic Layout with Alternate Tab Arrangement
-                pieces = [[(2, 0, 0, 1), (3, 0, 1, 1), x, z, 0b1001, 0b1101, 2],
-                          [(1, 0, 0, 0), (2, 0, 0, 1), z, y, 0b1100, 0b1110, 3],
-                          [(2, 0, 0, 1), (2, 0, 0, 1), x, y, 0b1100, 0b1111, 1],
-                          [(3, 1, 0, 1), (2, 0, 0, 1), z, y, 0b0110, 0b1011, 3],
-                          [(4, 1, 0, 2), (2, 0, 0, 1), x, y, 0b0110, 0b0000, 1],
-                          [(2, 0, 0, 1), (1, 0, 0, 0), x, z, 0b1100, 0b0111, 2]]
-        elif box_type == 3:  # Two sides open (x,y and x,z)
-            if layout == 1:  # Diagrammatic Layout
-                pieces = [[(2, 0, 0, 1), (1, 0, 0, 0), x, z, 0b1010, 0b0111, 2],
-                          [(1, 0, 0, 0), (2, 0, 0, 1), z, y, 0b1111, 0b1100, 3],
-                          [(2, 0, 0, 1), (2, 0, 0, 1), x, y, 0b0010, 0b1101, 1],
-                          [(3, 1, 0, 1), (2, 0, 0, 1), z, y, 0b1111, 0b1001, 3]]
-            elif layout == 2:  # 3 Piece Layout
-                pieces = [[(2, 0, 0, 1), (1, 0, 0, 0), x, z, 0b1010, 0b0111, 2],
-                          [(1, 0, 0, 0), (2, 0, 0, 1), z, y, 0b1111, 0b1100, 3],
-                          [(2, 0, 0, 1), (2, 0, 0, 1), x, y, 0b0010, 0b1101, 1]]
-            elif layout == 3:  # Inline(compact) Layout
-                pieces = [[(2, 2, 0, 2), (1, 0, 0, 0), x, z, 0b1010, 0b0111, 2],
-                          [(3, 2, 0, 0), (1, 0, 0, 0), z, y, 0b1111, 0b1100, 3],
-                          [(2, 1, 0, 0), (1, 0, 0, 0), x, y, 0b0010, 0b1101, 1],
-                          [(4, 2, 0, 1), (1, 0, 0, 0), z, y, 0b1111, 0b1001, 3]]
-            elif layout == 4:  # Diagrammatic Layout with Alternate Tab Arrangement
-                pieces = [[(2, 0, 0, 1), (1, 0, 0, 0), x, z, 0b1100, 0b0111, 2],
-                          [(1, 0, 0, 0), (2, 0, 0, 1), z, y, 0b1111, 0b1100, 3],
-                          [(2, 0, 0, 1), (2, 0, 0, 1), x, y, 0b1110, 0b1101, 1],
-                          [(3, 1, 0, 1), (2, 0, 0, 1), z, y, 0b0110, 0b1001, 3]]
-        elif box_type == 4:  # Three sides open (x,y, x,z and z,y)
-            if layout == 2:  # 3 Piece Layout
-                pieces = [[(2, 2, 0, 0), (2, 0, 1, 0), x, z, 0b1111, 0b1001, 2],
-                          [(1, 0, 0, 0), (1, 0, 0, 0), z, y, 0b1111, 0b0110, 3],
-                          [(2, 2, 0, 0), (1, 0, 0, 0), x, y, 0b1100, 0b0011, 1]]
+            continue
+        for n in range(0, count):
+            if select is None or select(role, n, piece[6]):
+                yield divider_piece(settings, piece, role, n)
+
+
+POOL_TYPES = ('process', 'thread')
+
+
+def make_pool(workers=0, pool_type='process'):
+    # type: (int, str) -> Any
+    """A pool of `workers` (0 = one per CPU) that run_jobs() can reuse.
+
+    Starting a pool can take longer than generating a box, so a batch should
+    make one pool for all its boxes (as ArchiveSink does) and close it at the
+    end.  Returns None for a single worker.  Use a 'process' pool for real
+    speed-ups; a 'thread' pool avoids process start-up cost but shares one
+    interpreter.
+    """
+    if pool_type not in POOL_TYPES:
+        raise ValueError('Unknown pool type: {}'.format(pool_type))
+    if workers == 1:
+        return None
+    import multiprocessing
+    from multiprocessing.pool import ThreadPool
+    if workers == 0:
+        workers = multiprocessing.cpu_count()
+    if pool_type == 'thread':
+        return ThreadPool(workers)
+    return multiprocessing.Pool(workers)
+
+
+def run_jobs(jobs, workers=1, pool_type='process', pool=None):
+    # type: (List[tuple], int, str, Any) -> List[List[Piece]]
+    """Generate piece jobs, serially or on a pool of `workers` (0 = one per CPU).
+
+    Results are always returned in job order, so the drawing is identical
+    whichever way the jobs were run.  Without a `pool` from make_pool(), one
+    is started for these jobs alone and closed again.
+    """
+    if pool is not None:
+        return pool.map(generate_job, jobs)
+    if pool_type not in POOL_TYPES:
+        raise ValueError('Unknown pool type: {}'.format(pool_type))
+    if workers == 0:
+        import multiprocessing
+        workers = multiprocessing.cpu_count()
+    if min(workers, len(jobs)) <= 1:
+        return [generate_job(job) for job in jobs]
+    pool = make_pool(min(workers, len(jobs)), pool_type)
+    try:
+        return pool.map(generate_job, jobs)
+    finally:
+        pool.close()
+        pool.join()
+
+
+# Geometry checks.  Generated pieces are checked as drawn: their outlines and
+# holes are put on a uniform grid index so that overlaps, stray holes and
+# joints that won't go together are found without comparing every pair of
+# segments, which keeps the checks fast on boxes with many dividers.
+
+TOLERANCE = 1e-4  # user units; geometry closer than this is taken to coincide
+
+SIDE_NAMES = ('top', 'right', 'bottom', 'left')  # sides a, b, c, d
+
+# for sides a, b, c, d: the coordinate (0 = x, 1 = y) each side runs along,
+# and whether its outer face is on the far side of the piece's rect
+SIDE_AXES = ((0, False), (1, True), (0, True), (1, False))
+
+# box axes that sides a/c and b/d of each piece type run along
+PIECE_AXES = {1: ('x', 'y'), 2: ('x', 'z'), 3: ('z', 'y')}
+
+# the piece type an edge along a box axis is jointed to
+MATING_TYPE = {('x', 1): 2, ('x', 2): 1, ('y', 1): 3, ('y', 3): 1,
+               ('z', 2): 3, ('z', 3): 2}
+
+# for each face of the box (see panel_faces()), the face and side (0-3 for
+# a-d) that each of its sides a, b, c, d is jointed to: the Diagrammatic
+# Layout folded up around the floor
+FACE_MATES = {'floor': (('back', 2), ('right', 3), ('front', 0), ('left', 1)),
+              'lid'  : (('back', 0), ('left', 3), ('front', 2), ('right', 1)),
+              'front': (('floor', 2), ('right', 2), ('lid', 2), ('left', 2)),
+              'back' : (('lid', 0), ('right', 0), ('floor', 0), ('left', 0)),
+              'left' : (('back', 3), ('floor', 3), ('front', 3), ('lid', 1)),
+              'right': (('back', 1), ('lid', 3), ('front', 1), ('floor', 1))}
+
+# the sides of a piece that become sides a, b, c, d of the second face it is
+# cut for, turned over (see panel_faces())
+TURNED_SIDES = {'back': (2, 1, 0, 3), 'right': (0, 3, 2, 1), 'lid': (0, 3, 2, 1)}
+
+
+class SpatialGrid(object):
+    """Uniform grid index of bounding boxes (x0, y0, x1, y1).
+
+    query() returns every value stored in the cells a box touches, a superset
+    of the values whose boxes overlap it.
+    """
+
+    def __init__(self, cell):
+        # type: (float) -> None
+        self.cell = cell
+        self.cells = {}  # type: Dict[Tuple[int, int], List[Any]]
+
+    def _keys(self, bbox):
+        # type: (Tuple[float, float, float, float]) -> List[Tuple[int, int]]
+        cell = self.cell
+        i0, j0 = int(math.floor(bbox[0] / cell)), int(math.floor(bbox[1] / cell))
+        i1, j1 = int(math.floor(bbox[2] / cell)), int(math.floor(bbox[3] / cell))
+        return [(i, j) for i in range(i0, i1 + 1) for j in range(j0, j1 + 1)]
+
+    def insert(self, bbox, value):
+        # type: (Tuple[float, float, float, float], Any) -> None
+        for key in self._keys(bbox):
+            self.cells.setdefault(key, []).append(value)
+
+    def query(self, bbox):
+        # type: (Tuple[float, float, float, float]) -> set
+        found = set()
+        for key in self._keys(bbox):
+            found.update(self.cells.get(key, ()))
+        return found
+
+
+def strip_reliefs(d, reliefs):
+    # type: (str, List[str]) -> str
+    """Path `d` without the corner reliefs in it (see FingerJoint.reliefs()).
+
+    Reliefs are stamped as runs of relative 'l' offsets that start and end on
+    their corner, so leaving them out leaves the path as a square cut joint
+    would have it.
+    """
+    if 'l' in d:
+        for relief in reliefs:
+            d = d.replace(relief, '')
+    return d
+
+
+def segment_bbox(segment):
+    # type: (Tuple[Tuple[float, float], Tuple[float, float]]) -> Tuple[float, float, float, float]
+    (ax, ay), (bx, by) = segment
+    return min(ax, bx), min(ay, by), max(ax, bx), max(ay, by)
+
+
+def boxes_overlap(a, b):
+    # type: (Tuple[float, float, float, float], Tuple[float, float, float, float]) -> bool
+    return (a[0] <= b[2] + TOLERANCE and b[0] <= a[2] + TOLERANCE and
+            a[1] <= b[3] + TOLERANCE and b[1] <= a[3] + TOLERANCE)
+
+
+def segments_cross(p, q):
+    # type: (Tuple[Tuple[float, float], Tuple[float, float]], Tuple[Tuple[float, float], Tuple[float, float]]) -> bool
+    """Whether two segments cross inside both; touching or running along doesn't count."""
+    def side(o, a, b):
+        area = (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+        return 0 if abs(area) < TOLERANCE * TOLERANCE else sgn(area)
+    return (side(q[0], q[1], p[0]) * side(q[0], q[1], p[1]) < 0 and
+            side(p[0], p[1], q[0]) * side(p[0], p[1], q[1]) < 0)
+
+
+class PieceShape(object):
+    """The outline and holes of a generated Piece as vertex lists.
+
+    Corner `reliefs` (see FingerJoint.reliefs()) are left out, as they only
+    ever remove material.  The outline's segments are indexed on a grid for
+    point and crossing tests, its cells a few segments long; most pieces are
+    never tested, so the grid is only built when it is first needed.
+
+    Each side keeps between its edge of the piece's rect and its innermost
+    vertex, so the rect `inner` inside all four touches none of them.  Side a
+    runs from the left of it to the right, above it, so a ray up from inside
+    it crosses the outline (only side a) an odd number of times: anything
+    within `inner` is inside the outline.
+    """
+
+    def __init__(self, piece, reliefs=()):
+        # type: (Piece, List[str]) -> None
+        self.piece = piece
+        self.sides = [[p for points in path_points(strip_reliefs(d, reliefs)) for p in points]
+                      for d in piece.outline]
+        xs = [p[0] for points in self.sides for p in points]
+        ys = [p[1] for points in self.sides for p in points]
+        self.bbox = (min(xs), min(ys), max(xs), max(ys))
+        self._grid = None  # type: Optional[SpatialGrid]
+        self._inner = False  # type: Any
+
+        self.holes = []  # type: List[List[Tuple[float, float]]]
+        for item in piece.holes:
+            if item[0] == 'circle':
+                r, cx, cy = item[1:]
+                self.holes.append([(cx - r, cy), (cx, cy - r), (cx + r, cy), (cx, cy + r)])
             else:
-                pieces = [[(3, 3, 0, 0), (1, 0, 0, 0), x, z, 0b1110, 0b1001, 2],
-                          [(1, 0, 0, 0), (1, 0, 0, 0), z, y, 0b1111, 0b0110, 3],
-                          [(2, 2, 0, 0), (1, 0, 0, 0), x, y, 0b1100, 0b0011, 1]]
-        elif box_type == 5:  # Opposite ends open (x,y)
-            if layout == 1:  # Diagrammatic Layout
-                pieces = [[(2, 0, 0, 1), (3, 0, 1, 1), x, z, 0b1010, 0b0101, 2],
-                          [(3, 1, 0, 1), (2, 0, 0, 1), z, y, 0b1111, 0b1010, 3],
-                          [(2, 0, 0, 1), (1, 0, 0, 0), x, z, 0b1010, 0b0101, 2],
-                          [(1, 0, 0, 0), (2, 0, 0, 1), z, y, 0b1111, 0b1010, 3]]
-            elif layout == 2:  # 2 Piece Layout
-                pieces = [[(1, 0, 0, 1), (1, 0, 1, 1), x, z, 0b1010, 0b0101, 2],
-                          [(2, 1, 0, 1), (1, 0, 0, 1), z, y, 0b1111, 0b1010, 3]]
-            elif layout == 3:  # Inline(compact) Layout
-                pieces = [[(1, 0, 0, 0), (1, 0, 0, 0), x, z, 0b1010, 0b0101, 2],
-                          [(3, 2, 0, 0), (1, 0, 0, 0), z, y, 0b1111, 0b1010, 3],
-                          [(2, 1, 0, 0), (1, 0, 0, 0), x, z, 0b1010, 0b0101, 2],
-                          [(4, 2, 0, 1), (2, 0, 0, 0), z, y, 0b1111, 0b1010, 3]]
-            elif layout == 4:  # Diagrammatic Layout with Alternate Tab Arrangement
-                pieces = [[(2, 0, 0, 1), (3, 0, 1, 1), x, z, 0b1011, 0b0101, 2],
-                          [(3, 1, 0, 1), (2, 0, 0, 1), z, y, 0b0111, 0b1010, 3],
-                          [(2, 0, 0, 1), (1, 0, 0, 0), x, z, 0b1110, 0b0101, 2],
-                          [(1, 0, 0, 0), (2, 0, 0, 1), z, y, 0b1101, 0b1010, 3]]
-        elif box_type == 6:  # 2 panels jointed (x,y and z,y joined along y)
-            pieces = [[(1, 0, 0, 0), (1, 0, 0, 0), x, y, 0b1011, 0b0100, 1],
-                      [(2, 1, 0, 0), (1, 0, 0, 0), z, y, 0b1111, 0b0001, 3]]
-        else:  # Fully enclosed
-            if layout == 1:  # Diagrammatic Layout
-                pieces = [[(2, 0, 0, 1), (3, 0, 1, 1), x, z, 0b1010, 0b1111, 2],
-                          [(1, 0, 0, 0), (2, 0, 0, 1), z, y, 0b1111, 0b1111, 3],
-                          [(2, 0, 0, 1), (2, 0, 0, 1), x, y, 0b0000, 0b1111, 1],
-                          [(3, 1, 0, 1), (2, 0, 0, 1), z, y, 0b1111, 0b1111, 3],
-                          [(4, 1, 0, 2), (2, 0, 0, 1), x, y, 0b0000, 0b1111, 1],
-                          [(2, 0, 0, 1), (1, 0, 0, 0), x, z, 0b1010, 0b1111, 2]]
-            elif layout == 2:  # 3 Piece Layout
-                pieces = [[(2, 0, 0, 1), (2, 0, 1, 0), x, z, 0b1010, 0b1111, 2],
-                          [(1, 0, 0, 0), (1, 0, 0, 0), z, y, 0b1111, 0b1111, 3],
-                          [(2, 0, 0, 1), (1, 0, 0, 0), x, y, 0b0000, 0b1111, 1]]
-            elif layout == 3:  # Inline(compact) Layout
-                pieces = [[(5, 2, 0, 2), (1, 0, 0, 0), x, z, 0b1111, 0b1111, 2],
-                          [(3, 2, 0, 0), (1, 0, 0, 0), z, y, 0b0101, 0b1111, 3],
-                          [(6, 3, 0, 2), (1, 0, 0, 0), x, z, 0b1111, 0b1111, 2],
-                          [(4, 2, 0, 1), (1, 0, 0, 0), z, y, 0b0101, 0b1111, 3],
-                          [(2, 1, 0, 0), (1, 0, 0, 0), x, y, 0b0000, 0b1111, 1],
-                          [(1, 0, 0, 0), (1, 0, 0, 0), x, y, 0b0000, 0b1111, 1]]
-            elif layout == 4:  # Diagrammatic Layout with Alternate Tab Arrangement
-                pieces = [[(2, 0, 0, 1), (3, 0, 1, 1), x, z, 0b1001, 0b1111, 2],
-                          [(1, 0, 0, 0), (2, 0, 0, 1), z, y, 0b1100, 0b1111, 3],
-                          [(2, 0, 0, 1), (2, 0, 0, 1), x, y, 0b1100, 0b1111, 1],
-                          [(3, 1, 0, 1), (2, 0, 0, 1), z, y, 0b0110, 0b1111, 3],
-                          [(4, 1, 0, 2), (2, 0, 0, 1), x, y, 0b0110, 0b1111, 1],
-                          [(2, 0, 0, 1), (1, 0, 0, 0), x, z, 0b1100, 0b1111, 2]]
-
-        for idx, piece in enumerate(pieces):  # generate and draw each piece of the box
-            (xs, xx, xy, xz) = piece[0]
-            (ys, yx, yy, yz) = piece[1]
-            x_ = xs * spacing + xx * x + xy * y + xz * z  # root x co-ord for piece
-            y_ = ys * spacing + yx * x + yy * y + yz * z  # root y co-ord for piece
-            dx = piece[2]
-            dy = piece[3]
-            tabs = piece[4]
-            a = tabs >> 3 & 1
-            b = tabs >> 2 & 1
-            c = tabs >> 1 & 1
-            d = tabs & 1  # extract tab status for each side
-            tabbed = piece[5]
-            a_tabs = tabbed >> 3 & 1
-            b_tabs = tabbed >> 2 & 1
-            c_tabs = tabbed >> 1 & 1
-            d_tabs = tabbed & 1  # extract tabbed flag for each side
-            x_spacing = (x - thickness) / (div_y + 1)
-            y_spacing = (y - thickness) / (div_x + 1)
-            x_holes = 1 if piece[6] < 3 else 0   # 3 is a YZ piece
-            y_holes = 1 if piece[6] != 2 else 0  # 2 is an XZ piece
-            wall = 1 if piece[6] > 1 else 0
-            floor = 1 if piece[6] == 1 else 0    # 1 is an XY piece
-            rail_holes = 1 if piece[6] == 3 else 0
-
-            if schroff and rail_holes:
-                log("rail holes enabled on piece {} at ({}, {})".format(idx,
-                                                                        x_ + thickness,
-                                                                        y_ + thickness))
-                log("abcd = ({},{},{},{})".format(a, b, c, d))
-                log("dxdy = ({},{})".format(dx, dy))
-                rhx_offset = rail_mount_depth + thickness
-                if idx == 1:
-                    rhx = x_ + rhx_offset
-                elif idx == 3:
-                    rhx = x_ - rhx_offset + dx
-                else:
-                    rhx = 0
-                log("rhx_offset = {}, rhx= {}".format(rhx_offset, rhx))
-                ry_start = y_ + (rail_height / 2) + thickness
-                if rows == 1:
-                    log("just one row this time, ry_start = {}".format(ry_start))
-                    rh1y = ry_start + rail_mount_centre_offset
-                    rh2y = rh1y + (row_centre_spacing - rail_mount_centre_offset)
-                    draw_circle(rail_mount_radius, rhx, rh1y)
-                    draw_circle(rail_mount_radius, rhx, rh2y)
+                self.holes.extend(path_points(strip_reliefs(item[1], reliefs)))
+
+    @property
+    def name(self):
+        # type: () -> str
+        return '{} {}'.format(self.piece.role.replace('_', '-'), self.piece.index + 1)
+
+    @property
+    def grid(self):
+        # type: () -> SpatialGrid
+        if self._grid is None:
+            points = [p for points in self.sides for p in points]
+            self.segments = list(zip(points, points[1:] + points[:1]))
+            self.boxes = [segment_bbox(segment) for segment in self.segments]
+            extent = max(self.bbox[2] - self.bbox[0], self.bbox[3] - self.bbox[1])
+            run = sum(max(box[2] - box[0], box[3] - box[1]) for box in self.boxes)
+            self._grid = SpatialGrid(max(4 * run / len(self.boxes), extent / 256) or 1)
+            for n, box in enumerate(self.boxes):
+                self._grid.insert(box, n)
+        return self._grid
+
+    @property
+    def inner(self):
+        # type: () -> Optional[Tuple[float, float, float, float]]
+        """A rect inside the outline and clear of it, or None if there isn't one."""
+        if self._inner is False:
+            a, b, c, d = self.sides
+            inner = (max(p[0] for p in d), max(p[1] for p in a),
+                     min(p[0] for p in b), min(p[1] for p in c))
+            if not (inner[0] < inner[2] and inner[1] < inner[3] and
+                    a[0][0] <= inner[0] and a[-1][0] >= inner[2]):
+                inner = None
+            self._inner = inner
+        return self._inner
+
+    def well_inside(self, bbox):
+        # type: (Tuple[float, float, float, float]) -> bool
+        """Whether `bbox` is inside `inner`, so inside the outline and clear of it."""
+        inner = self.inner
+        return (inner is not None and inner[0] < bbox[0] and bbox[2] < inner[2] and
+                inner[1] < bbox[1] and bbox[3] < inner[3])
+
+    def near(self, bbox):
+        # type: (Tuple[float, float, float, float]) -> List[tuple]
+        """Outline segments whose bounding boxes overlap `bbox`."""
+        grid = self.grid
+        segments, boxes = self.segments, self.boxes
+        return [segments[n] for n in grid.query(bbox) if boxes_overlap(boxes[n], bbox)]
+
+    def contains(self, px, py):
+        # type: (float, float) -> bool
+        """Whether (px, py) is inside the outline or on it."""
+        # cast the ray to the nearest side, crossing fewer grid cells
+        x0, y0, x1, y1 = self.bbox
+        way = min((px - x0, 0), (x1 - px, 1), (py - y0, 2), (y1 - py, 3))[1]
+        ray = ((x0, py, px + TOLERANCE, py), (px - TOLERANCE, py, x1, py),
+               (px, y0, px, py + TOLERANCE), (px, py - TOLERANCE, px, y1))[way]
+        # crossings are counted on the ray's axis, `u` along it and `v` across
+        (u, v, back) = (px, py, way in (0, 2)) if way < 2 else (py, px, way == 2)
+        inside = False
+        for (ax, ay), (bx, by) in self.near(ray):
+            dx, dy = bx - ax, by - ay
+            t = ((px - ax) * dx + (py - ay) * dy) / (dx * dx + dy * dy or 1)
+            t = max(0.0, min(1.0, t))
+            if math.hypot(ax + t * dx - px, ay + t * dy - py) < TOLERANCE:
+                return True  # on the outline
+            if way >= 2:
+                (ax, ay, bx, by, dx, dy) = (ay, ax, by, bx, dy, dx)
+            if (ay > v) != (by > v) and (ax + (v - ay) * dx / dy < u) == back:
+                inside = not inside
+        return inside
+
+    def mouth(self, px, py):
+        # type: (float, float) -> bool
+        """Whether (px, py) is on an edge of the piece's rect, as slot openings are."""
+        rx, ry, rw, rh = self.piece.rect
+        return (abs(px - rx) < TOLERANCE or abs(px - rx - rw) < TOLERANCE or
+                abs(py - ry) < TOLERANCE or abs(py - ry - rh) < TOLERANCE)
+
+
+def check_overlaps(shapes):
+    # type: (List[PieceShape]) -> List[str]
+    """Pieces whose outlines cross, or that lie one inside another, on the sheet."""
+    errors = []
+    largest = max(max(s.bbox[2] - s.bbox[0], s.bbox[3] - s.bbox[1]) for s in shapes)
+    grid = SpatialGrid(largest or 1)
+    for n, shape in enumerate(shapes):
+        grid.insert(shape.bbox, n)
+    for n, a in enumerate(shapes):
+        for m in sorted(grid.query(a.bbox)):
+            b = shapes[m]
+            if m <= n or not boxes_overlap(a.bbox, b.bbox):
+                continue
+            common = (max(a.bbox[0], b.bbox[0]), max(a.bbox[1], b.bbox[1]),
+                      min(a.bbox[2], b.bbox[2]), min(a.bbox[3], b.bbox[3]))
+            overlap = any(segments_cross(p, q)
+                          for p in a.near(common) for q in b.near(segment_bbox(p)))
+            if not overlap:  # no crossings, so one could still hold the other
+                ax, ay, aw, ah = a.piece.rect
+                bx, by, bw, bh = b.piece.rect
+                overlap = (b.contains(ax + aw / 2, ay + ah / 2) or
+                           a.contains(bx + bw / 2, by + bh / 2))
+            if overlap:
+                errors.append('Warning: {} overlaps {}'.format(a.name, b.name))
+    return errors
+
+
+def check_holes(shapes):
+    # type: (List[PieceShape]) -> List[str]
+    """Holes that aren't inside their piece's outline.
+
+    Slots cut in from the edge of a piece (as dividers have) may open onto
+    the edge of its rect.
+    """
+    errors = []
+    for shape in shapes:
+        outside = 0
+        for points in shape.holes:
+            if all(shape.mouth(px, py) or shape.well_inside((px, py, px, py))
+                   for (px, py) in points):
+                continue  # found without the outline's grid
+            xs = [p[0] for p in points]
+            ys = [p[1] for p in points]
+            bbox = (min(xs), min(ys), max(xs), max(ys))
+            if not shape.near(bbox):
+                # clear of the outline, so all in or all out
+                points = points[:1]
+            if not all(shape.mouth(px, py) or shape.contains(px, py) for (px, py) in points):
+                outside += 1
+        if outside:
+            errors.append('Warning: {} hole(s) of {} are outside it'.format(outside, shape.name))
+    return errors
+
+
+def merge_intervals(intervals):
+    # type: (List[Tuple[float, float]]) -> List[Tuple[float, float]]
+    merged = []  # type: List[Tuple[float, float]]
+    for lo, hi in sorted(intervals):
+        if merged and lo <= merged[-1][1] + TOLERANCE:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return merged
+
+
+def intersect_intervals(a, b):
+    # type: (List[Tuple[float, float]], List[Tuple[float, float]]) -> List[Tuple[float, float]]
+    """Overlaps of two sorted lists of disjoint intervals."""
+    found = []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        lo, hi = max(a[i][0], b[j][0]), min(a[i][1], b[j][1])
+        if hi > lo:
+            found.append((lo, hi))
+        if a[i][1] < b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return found
+
+
+def invert_intervals(intervals, length):
+    # type: (List[Tuple[float, float]], float) -> List[Tuple[float, float]]
+    """The parts of 0..length not covered by sorted disjoint intervals."""
+    gaps = []
+    at = 0.0
+    for lo, hi in intervals:
+        if lo > at:
+            gaps.append((at, lo))
+        at = max(at, hi)
+    if at < length:
+        gaps.append((at, length))
+    return gaps
+
+
+def edge_profile(shape, side):
+    # type: (PieceShape, int) -> List[Tuple[float, float]]
+    """Where a side reaches its outer face, measured along the piece's rect.
+
+    These are the tabs of a tab edge, and the material between the gaps of a
+    gap edge.
+    """
+    axis, far = SIDE_AXES[side]
+    rect = shape.piece.rect
+    level = rect[1 - axis] + (rect[3 - axis] if far else 0)
+    points = shape.sides[side]
+    return merge_intervals([
+        tuple(sorted((p[axis] - rect[axis], q[axis] - rect[axis])))
+        for p, q in zip(points, points[1:])
+        if abs(p[1 - axis] - level) < TOLERANCE and abs(q[1 - axis] - level) < TOLERANCE
+        and abs(p[axis] - q[axis]) > TOLERANCE])
+
+
+def hole_rows(shape, thickness):
+    # type: (PieceShape, float) -> List[Tuple[int, float, List[Tuple[float, float]], bool]]
+    """Rows of rectangular holes one thickness wide, such as divider holes.
+
+    Returns (axis, length, solid, square) for each row: the coordinate it runs
+    along, the length of the rect along it, the material left between the
+    holes, and whether every hole is square (so the row may run either way).
+    """
+    rows = {}  # type: Dict[Tuple[int, float], List[Tuple[float, float]]]
+    rect = shape.piece.rect
+    for points in shape.holes:
+        if len(points) != 5:
+            continue
+        bounds = ((min(p[0] for p in points), max(p[0] for p in points)),
+                  (min(p[1] for p in points), max(p[1] for p in points)))
+        for axis in (0, 1):
+            across = bounds[1 - axis]
+            if abs(across[1] - across[0] - thickness) < TOLERANCE:
+                along = bounds[axis]
+                rows.setdefault((axis, round(across[0], 4)), []).append(
+                    (along[0] - rect[axis], along[1] - rect[axis]))
+    return [(axis, rect[2 + axis],
+             invert_intervals(merge_intervals(holes), rect[2 + axis]),
+             all(abs(hi - lo - thickness) < TOLERANCE for (lo, hi) in holes))
+            for (axis, _), holes in rows.items()]
+
+
+def joints_mate(tabs, solid, length, settings, end=None):
+    # type: (List[Tuple[float, float]], List[Tuple[float, float]], float, Dict[str, Any], Optional[float]) -> bool
+    """Whether an edge's `tabs` interlock with the `solid` parts of the edge or
+    row of holes it is jointed to, either way round.
+
+    Away from the corners (`end` from each end, by default the thickness), the
+    tabs of one must fill the gaps of the other, overlapping by no more than
+    the kerf correction (or leaving no more than a negative correction between
+    them).
+    """
+    fit = settings['correction']
+    if end is None:
+        end = settings['thickness']
+    window = [(end + TOLERANCE, length - end - TOLERANCE)]
+    tabs = intersect_intervals(tabs, window)
+    for other in (solid, [(length - hi, length - lo) for (lo, hi) in reversed(solid)]):
+        other = intersect_intervals(other, window)
+        clashes = intersect_intervals(tabs, other)
+        gaps = intersect_intervals(
+            invert_intervals(merge_intervals(tabs + other), length), window)
+        if (all(hi - lo < max(fit, 0) + TOLERANCE for (lo, hi) in clashes) and
+                all(hi - lo < max(-fit, 0) + TOLERANCE for (lo, hi) in gaps)):
+            return True
+    return False
+
+
+def check_joints(shapes, settings):
+    # type: (List[PieceShape], Dict[str, Any]) -> List[str]
+    """Simulate assembly: every jointed edge of a panel must interlock with the
+    edge it meets in the box (see panel_faces()), every jointed edge of a
+    divider with a row of holes the same length along the same box axis, and
+    every row of divider holes with a divider.
+    """
+    t = settings['thickness']
+    # with living hinges the joints along the box's length and width stop
+    # short of the rounded corners, and the walls are cut back at each end
+    # (see panel_piece())
+    ends = {'x': t, 'y': t, 'z': t}
+    inset = 0.0
+    if settings['hinge']:
+        ends['x'] = ends['y'] = hinge_radius(settings)
+        inset = ends['x'] - settings['hinge_width']
+    faces = panel_faces(settings['box_type'], settings['layout'])
+    # the panel each face of the box is cut from, and its sides in the
+    # face's order a, b, c, d
+    placed = {}  # type: Dict[str, Tuple[int, Tuple[int, ...]]]
+    # (length, profile) of every side of the panels, by (index, side)
+    edges = {}  # type: Dict[Tuple[int, int], Tuple[float, List[Tuple[float, float]]]]
+    # jointed edges of dividers, and rows of divider holes in panels, by
+    # (box axis, piece type, length)
+    dividers = {}  # type: Dict[Tuple[str, int, float], List[List[Tuple[float, float]]]]
+    rows = {}  # type: Dict[Tuple[str, int, float], List[List[Tuple[float, float]]]]
+    jointed = []
+    holed = []
+    for shape in shapes:
+        piece = shape.piece
+        axes = PIECE_AXES[piece.piece_type]
+        if piece.role == 'panel':
+            for n, face in enumerate(faces[piece.index]):
+                placed[face] = (piece.index, TURNED_SIDES[face] if n else (0, 1, 2, 3))
+        for side in range(4):
+            axis = axes[side % 2]
+            length = piece.rect[2 + SIDE_AXES[side][0]]
+            profile = edge_profile(shape, side)
+            if inset and piece.role == 'panel' and piece.piece_type > 1 and axis != 'z':
+                # measure along the wall before it was cut back
+                profile = [(lo + inset, hi + inset) for (lo, hi) in profile]
+                length += 2 * inset
+            key = (axis, piece.piece_type, round(length, 4))
+            if piece.role == 'panel':
+                edges[piece.index, side] = (key[2], profile)
+            window = [(ends[axis] + TOLERANCE, length - ends[axis] - TOLERANCE)]
+            if intersect_intervals(profile, window) in ([], window):
+                continue  # a plain edge
+            jointed.append((shape, side, key, profile))
+            if piece.role != 'panel':
+                dividers.setdefault(key, []).append(profile)
+        if piece.role == 'panel':
+            for axis, length, solid, square in hole_rows(shape, t):
+                key = (axes[axis], piece.piece_type, round(length, 4))
+                rows.setdefault(key, []).append(solid)
+                if not square:
+                    holed.append((shape, key, solid))
+
+    errors = []
+    for shape, side, (axis, piece_type, length), profile in jointed:
+        if shape.piece.role == 'panel':
+            # a piece cut for two faces must fit both
+            mates = []
+            for face in faces[shape.piece.index]:
+                mate, mate_side = FACE_MATES[face][placed[face][1].index(side)]
+                if mate in placed:
+                    index, sides = placed[mate]
+                    mates.append(edges[index, sides[mate_side]])
                 else:
-                    for n in range(0, rows):
-                        log("drawing row {}, ry_start = {}".format(n + 1, ry_start))
-                        # if holes are offset (eg. Vector T-strut rails), they should
-                        # be offset
-                        # toward each other, ie. toward the centreline of the Schroff row
-                        rh1y = ry_start + rail_mount_centre_offset
-                        rh2y = rh1y + row_centre_spacing - rail_mount_centre_offset
-                        draw_circle(rail_mount_radius, rhx, rh1y)
-                        draw_circle(rail_mount_radius, rhx, rh2y)
-                        ry_start += row_centre_spacing + row_spacing + rail_height
-
-            # generate and draw the sides of each piece
-            side_a = side(root_coord=(x_, y_),
-                          start_offset_coord=(d, a),
-                          end_offset_coord=(-b, a),
-                          tab_vec=a_tabs * (-thickness if a else thickness),
-                          length=dx,
-                          direction=(1, 0),
-                          is_tab=a,
-                          is_divider=False,
-                          num_dividers=(key_div_floor | wall) * (
-                                  key_div_walls | floor) * div_x * y_holes * a_tabs,
-                          div_spacing=y_spacing,
-                          div_offset=div_offset)
-
-            side_b = side(root_coord=(x_ + dx, y_),
-                          start_offset_coord=(-b, a),
-                          end_offset_coord=(-b, -c),
-                          tab_vec=b_tabs * (thickness if b else -thickness),
-                          length=dy,
-                          direction=(0, 1),
-                          is_tab=b,
-                          is_divider=False,
-                          num_dividers=(key_div_floor | wall) * (
-                                  key_div_walls | floor) * div_y * x_holes * b_tabs,
-                          div_spacing=x_spacing,
-                          div_offset=div_offset)
-
-            if a_tabs:
-                side_c = side(root_coord=(x_ + dx, y_ + dy),
-                              start_offset_coord=(-b, -c),
-                              end_offset_coord=(d, -c),
-                              tab_vec=c_tabs * (thickness if c else -thickness),
-                              length=dx,
-                              direction=(-1, 0),
-                              is_tab=c,
-                              is_divider=False,
-                              num_dividers=0,
-                              div_spacing=0,
-                              div_offset=div_offset)
+                    mates.append((None, []))
+            fits = all(other_length == length and
+                       joints_mate(profile, other, length, settings, ends[axis])
+                       for other_length, other in mates)
+            missing = 'edge'
+        else:
+            key = (axis, MATING_TYPE[axis, piece_type], length)
+            fits = any(joints_mate(profile, other, length, settings, ends[axis])
+                       for other in rows.get(key, []))
+            missing = 'holes'
+        if not fits:
+            errors.append('Warning: tabs on the {} side of {} have no matching {}'.format(
+                SIDE_NAMES[side], shape.name, missing))
+
+    stray = {}  # type: Dict[str, int]
+    for shape, (axis, piece_type, length), solid in holed:
+        key = (axis, MATING_TYPE[axis, piece_type], length)
+        if not any(joints_mate(profile, solid, length, settings, ends[axis])
+                   for profile in dividers.get(key, [])):
+            stray[shape.name] = stray.get(shape.name, 0) + 1
+    for shape in shapes:
+        if shape.name in stray:
+            errors.append('Warning: {} row(s) of divider holes in {} match no divider'.format(
+                stray[shape.name], shape.name))
+    return errors
+
+
+def verify_pieces(pieces, settings):
+    # type: (List[Piece], Dict[str, Any]) -> List[str]
+    """Return warnings for generated pieces that can't be cut and assembled.
+
+    Pieces must not overlap on the sheet, holes must be inside their pieces,
+    and the tabs of every jointed edge must meet gaps on the edge (or divider
+    holes) they are jointed to.
+    """
+    reliefs = get_joint(settings['joint'], settings['thickness'], settings['tool_diameter'],
+                        settings['correction'], settings['hardware']).reliefs()
+    shapes = [PieceShape(piece, reliefs) for piece in pieces]
+    if not shapes:
+        return []
+    return check_overlaps(shapes) + check_holes(shapes) + check_joints(shapes, settings)
+
+
+# Batch output.  Boxes are generated straight from a spec (a dict of option
+# values keyed by the extension's option names) with millimetre user units,
+# without an Inkscape document.
+
+DEFAULT_SPEC = {'schroff'                 : 0,
+                'rail_height'             : 10.0,
+                'rail_mount_depth'        : 17.4,
+                'rail_mount_centre_offset': 0.0,
+                'rows'                    : 0,
+                'hp'                      : 0,
+                'row_spacing'             : 10.0,
+                'unit'                    : 'mm',
+                'inside'                  : 1,
+                'length'                  : 180,
+                'width'                   : 240,
+                'height'                  : 50,
+                'tab'                     : 6.0,
+                'equal'                   : 0,
+                'hairline'                : 0,
+                'thickness'               : 3.0,
+                'kerf'                    : 0.1,
+                'clearance'               : 0.01,
+                'style'                   : 1,
+                'spacing'                 : 1.0,
+                'boxtype'                 : 1,
+                'div_l'                   : 2,
+                'div_w'                   : 3,
+                'keydiv'                  : 3,
+                'hinge'                   : 0,
+                'hinge_width'             : 20.0,
+                'slit_length'             : 20.0,
+                'slit_spacing'            : 1.5,
+                'hinge_bridge'            : 3.0,
+                'joint'                   : 'finger',
+                'tool_diameter'           : 3.175,
+                'screw_diameter'          : 3.0,
+                'screw_length'            : 16.0,
+                'nut_width'               : 5.5,
+                'nut_thickness'           : 2.4}  # defaults as in boxmaker.inx
+
+MM_PER_UNIT = {'mm': 1.0, 'cm': 10.0, 'in': 25.4, 'pt': 25.4 / 72, 'px': 25.4 / 96}
+
+MANIFEST_NAME = 'manifest.jsonl'
+
+THUMBNAIL_BORDER = 2  # pixels of white around a thumbnail's drawing
+
+
+def mm_unittouu(string):
+    # type: (str) -> float
+    """unittouu() for batch output, where one user unit is one millimetre."""
+    string = string.strip()
+    for unit in MM_PER_UNIT:
+        if string.endswith(unit):
+            return float(string[:-len(unit)]) * MM_PER_UNIT[unit]
+    return float(string)
+
+
+def spec_options(spec):
+    # type: (Dict[str, Any]) -> Dict[str, Any]
+    options = dict(DEFAULT_SPEC)
+    options.update(spec)
+    return options
+
+
+def spec_hash(spec):
+    # type: (Dict[str, Any]) -> str
+    """Stable hash of a spec, including the defaults it leaves out."""
+    import hashlib
+    import json
+    canonical = json.dumps(spec_options(spec), sort_keys=True)
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+def spec_settings(spec):
+    # type: (Dict[str, Any]) -> Dict[str, Any]
+    """Convert a spec to checked settings, raising ValueError if it can't make a box."""
+    settings = box_settings(spec_options(spec), mm_unittouu)
+    errors = check_settings(settings)
+    if errors:
+        raise ValueError('; '.join(errors))
+    return settings
+
+
+def make_pieces(spec, workers=1, pool_type='process', pool=None):
+    # type: (Dict[str, Any], int, str, Any) -> Tuple[Dict[str, Any], List[tuple], List[Piece]]
+    """Generate a box from a spec, returning (settings, jobs, pieces).
+
+    The jobs are run as by run_jobs().  Raises ValueError with the same
+    messages the extension would show if the spec can't make a box.
+    """
+    settings = spec_settings(spec)
+    pieces = get_pieces(settings['box_type'], settings['layout'],
+                        settings['x'], settings['y'], settings['z'])
+    jobs = box_jobs(settings, pieces)
+    pieces = [piece for result in run_jobs(jobs, workers, pool_type, pool)
+              for piece in result]
+    return settings, jobs, pieces
+
+
+def make_box(spec, workers=1, pool_type='process', pool=None):
+    # type: (Dict[str, Any], int, str, Any) -> Tuple[Dict[str, Any], List[tuple], List[tuple]]
+    """Generate a box from a spec, returning (settings, jobs, items).
+
+    Raises ValueError as make_pieces does.
+    """
+    settings, jobs, pieces = make_pieces(spec, workers, pool_type, pool)
+    return settings, jobs, [item for piece in pieces for item in piece.items()]
+
+
+def iter_box(spec, select=None):
+    # type: (Dict[str, Any], Optional[Callable[[str, int, int], bool]]) -> Iterator[Piece]
+    """Generate a box from a spec lazily, one Piece at a time.
+
+    See iter_pieces for `select`.  Raises ValueError as make_box does.
+    """
+    return iter_pieces(spec_settings(spec), select)
+
+
+def verify_box(spec):
+    # type: (Dict[str, Any]) -> List[str]
+    """Generate a box from a spec and return its verify_pieces warnings."""
+    settings = spec_settings(spec)
+    return verify_pieces(list(iter_pieces(settings)), settings)
+
+
+# verify_self_check() damages this box: its dividers put holes by the corners
+# of the walls, where the reliefs of the outline are
+# thick enough for the default T-slot hardware
+SELF_CHECK_SPEC = {'style': 3, 'keydiv': 0, 'div_l': 2, 'div_w': 3, 'thickness': 6}
+
+
+def verify_self_check():
+    # type: () -> List[str]
+    """Check that verify_pieces() finds the same faults whatever the joint.
+
+    SELF_CHECK_SPEC is generated with each joint type, and a small hole is
+    added to the first panel, with a spur going out past the panel's left
+    edge and back, as a relief turned the wrong way would.  Corner reliefs
+    and fasteners stay inside the pieces, so every joint must give the same
+    warnings, including one for that hole.  A box with its front panel cut
+    from the back panel's outline must be found not to fit together.
+    Returns what went wrong, if anything.
+    """
+    failures = []
+    found = []
+    for joint in ('finger', 'dogbone', 'tbone', 'tslot'):
+        settings, jobs, pieces = make_pieces(dict(SELF_CHECK_SPEC, joint=joint))
+        piece = pieces[0]
+        t = settings['thickness']
+        (hx, hy) = (piece.rect[0] + 2 * t, piece.rect[1] + piece.rect[3] / 2)
+        d = 'M {},{} l {},0 l {},0 '.format(hx, hy, -3 * t, 3 * t)
+        d += ''.join(['L {},{} '.format(hx + px, hy + py)
+                      for (px, py) in ((t / 2, 0), (t / 2, t / 2), (0, t / 2), (0, 0))])
+        pieces[0] = piece._replace(holes=piece.holes + [('path', d)])
+        warnings = verify_pieces(pieces, settings)
+        expected = 'Warning: 1 hole(s) of panel {} are outside it'.format(piece.index + 1)
+        if expected not in warnings:
+            failures.append('{}: hole reaching out of its panel not found'.format(joint))
+        found.append(warnings)
+        if warnings != found[0]:
+            failures.append('{}: warnings differ from finger joints'.format(joint))
+
+    # with the alternate tab arrangement the front and back panels differ, and
+    # each edge of one fits an edge of the same length somewhere in the box,
+    # but not the edges the front meets
+    settings, jobs, pieces = make_pieces(dict(SELF_CHECK_SPEC, style=4))
+    front = pieces[0]
+    back = [piece for piece in pieces if piece.role == 'panel' and piece.index == 5][0]
+    (dx, dy) = (front.rect[0] - back.rect[0], front.rect[1] - back.rect[1])
+    pieces[0] = front._replace(outline=[
+        ''.join(['M {},{} '.format(points[0][0] + dx, points[0][1] + dy)] +
+                ['L {},{} '.format(px + dx, py + dy) for (px, py) in points[1:]])
+        for d in back.outline for points in path_points(d)])
+    warnings = verify_pieces(pieces, settings)
+    expected = 'Warning: tabs on the right side of panel {} have no matching edge'.format(
+        front.index + 1)
+    if expected not in warnings:
+        failures.append('back panel cut for the front not found')
+    return failures
+
+
+def count_pieces(jobs):
+    # type: (List[tuple]) -> int
+    count = 0
+    for kind, settings, idx, piece in jobs:
+        if kind == 'panel':
+            count += 1
+        elif kind == 'x_dividers':
+            count += settings['div_x']
+        else:
+            count += settings['div_y']
+    return count
+
+
+def path_points(d):
+    # type: (str) -> List[List[Tuple[float, float]]]
+    """The vertices of each subpath of a 'M x,y L x,y l dx,dy ...' path."""
+    subpaths = []
+    relative = False
+    for token in d.split():
+        if token == 'M':
+            points = []
+            subpaths.append(points)
+            relative = False
+        elif token == 'L' or token == 'l':
+            relative = token == 'l'
+        else:
+            px, py = token.split(',')
+            if relative:
+                (lx, ly) = points[-1]
+                points.append((lx + float(px), ly + float(py)))
             else:
-                side_c = side(root_coord=(x_ + dx, y_ + dy),
-                              start_offset_coord=(-b, -c),
-                              end_offset_coord=(d, -c),
-                              tab_vec=c_tabs * (thickness if c else -thickness),
-                              length=dx,
-                              direction=(-1, 0),
-                              is_tab=c,
-                              is_divider=False,
-                              num_dividers=(key_div_floor | wall) * (
-                                      key_div_walls | floor) * div_x * y_holes *
-                                           c_tabs,
-                              div_spacing=y_spacing,
-                              div_offset=div_offset)
-
-            if b_tabs:
-                side_d = side(root_coord=(x_, y_ + dy),
-                              start_offset_coord=(d, -c),
-                              end_offset_coord=(d, a),
-                              tab_vec=d_tabs * (-thickness if d else thickness),
-                              length=dy,
-                              direction=(0, -1),
-                              is_tab=d,
-                              is_divider=False,
-                              num_dividers=0,
-                              div_spacing=0,
-                              div_offset=div_offset)
+                points.append((float(px), float(py)))
+    return subpaths
+
+
+def measure(items):
+    # type: (List[tuple]) -> Tuple[float, float, float, float, float]
+    """Return (min_x, min_y, max_x, max_y, cut_length) of generated items."""
+    min_x = min_y = float('inf')
+    max_x = max_y = float('-inf')
+    length = 0.0
+    for item in items:
+        if item[0] == 'circle':
+            r, cx, cy = item[1:]
+            min_x, min_y = min(min_x, cx - r), min(min_y, cy - r)
+            max_x, max_y = max(max_x, cx + r), max(max_y, cy + r)
+            length += 2 * math.pi * r
+            continue
+        for points in path_points(item[1]):
+            (lx, ly) = points[0]
+            for (px, py) in points:
+                min_x, min_y = min(min_x, px), min(min_y, py)
+                max_x, max_y = max(max_x, px), max(max_y, py)
+                length += math.hypot(px - lx, py - ly)
+                (lx, ly) = (px, py)
+    return min_x, min_y, max_x, max_y, length
+
+
+def render_svg(items, line_thickness=1, extent=None):
+    # type: (List[tuple], float, Optional[Tuple[float, float, float, float]]) -> bytes
+    """Render generated items as a standalone SVG document in millimetres."""
+    if extent is None:
+        extent = measure(items)[:4]
+    min_x, min_y, max_x, max_y = extent
+    min_x -= line_thickness
+    min_y -= line_thickness
+    width = max_x - min_x + line_thickness
+    height = max_y - min_y + line_thickness
+    style = 'stroke:#000000;stroke-width:{};fill:none'.format(line_thickness)
+
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+             '<svg xmlns="http://www.w3.org/2000/svg" width="{0}mm" height="{1}mm" '
+             'viewBox="{2} {3} {0} {1}">'.format(width, height, min_x, min_y)]
+    for item in items:
+        if item[0] == 'circle':
+            lines.append('<circle style="{}" r="{}" cx="{}" cy="{}"/>'.format(style,
+                                                                              *item[1:]))
+        else:
+            lines.append('<path style="{}" d="{}"/>'.format(style, item[1].strip()))
+    lines.append('</svg>\n')
+    return '\n'.join(lines).encode('utf-8')
+
+
+def item_segments(items):
+    # type: (List[tuple]) -> Any
+    """Every straight cut in generated items, as an N x 4 array of x0, y0, x1, y1.
+
+    Paths always alternate command letters and 'x,y' pairs, so all of them are
+    parsed in one go; circles are drawn as polygons.  The array is empty when
+    there is nothing to draw.
+    """
+    tokens = ' '.join([item[1] for item in items if item[0] == 'path']).split()
+    segments = [np.zeros((0, 4))]
+    if tokens:
+        segments.append(path_segments(tokens))
+    for item in items:
+        if item[0] == 'circle':
+            r, cx, cy = item[1:]
+            loop = np.array(circle_points(cx, cy, r, 0, 16))
+            segments.append(np.hstack((loop, np.roll(loop, -1, axis=0))))
+    return np.concatenate(segments)
+
+
+def path_segments(tokens):
+    # type: (List[str]) -> Any
+    """The straight cuts of the tokens of one or more paths (see item_segments())."""
+    commands = np.array(tokens[0::2])
+    points = np.array(','.join(tokens[1::2]).split(','), dtype=float).reshape(-1, 2)
+    absolute = commands != 'l'
+    if not absolute.all():
+        # relief stamps are relative: add each run of offsets onto the absolute
+        # point before it
+        totals = np.cumsum(points, axis=0)
+        starts = np.flatnonzero(absolute)
+        points = totals - (totals[starts] - points[starts])[np.cumsum(absolute) - 1]
+    drawn = commands[1:] != 'M'  # a move starts a new subpath
+    return np.hstack((points[:-1][drawn], points[1:][drawn]))
+
+
+def rasterize(segments, width, height):
+    # type: (Any, int, int) -> Any
+    """Draw segments (in pixels) as black lines on a white width x height image.
+
+    Each segment is sampled once per pixel along its longer axis; all samples
+    of all segments are computed and plotted as single array operations.
+    """
+    image = np.full((height, width), 255, dtype=np.uint8)
+    if not len(segments):
+        return image
+    start = segments[:, :2]
+    delta = segments[:, 2:] - start
+    samples = np.ceil(np.abs(delta).max(axis=1)).astype(int) + 1
+    owner = np.repeat(np.arange(len(segments)), samples)
+    first = np.repeat(np.cumsum(samples) - samples, samples)
+    t = (np.arange(samples.sum()) - first) / np.maximum(samples[owner] - 1, 1)
+    points = np.rint(start[owner] + delta[owner] * t[:, np.newaxis]).astype(int)
+    xs = np.clip(points[:, 0], 0, width - 1)
+    ys = np.clip(points[:, 1], 0, height - 1)
+    image[ys, xs] = 0
+    return image
+
+
+def png_bytes(image):
+    # type: (Any) -> bytes
+    """Encode an 8-bit greyscale image array as a PNG file."""
+    height, width = image.shape
+    raw = np.hstack((np.zeros((height, 1), dtype=np.uint8), image)).tobytes()
+
+    def chunk(tag, data):
+        return (struct.pack('>I', len(data)) + tag + data +
+                struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff))
+
+    return (b'\x89PNG\r\n\x1a\n' +
+            chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0)) +
+            chunk(b'IDAT', zlib.compress(raw, 6)) +
+            chunk(b'IEND', b''))
+
+
+def render_png(items, size=256, extent=None, border=THUMBNAIL_BORDER):
+    # type: (List[tuple], int, Optional[Tuple[float, float, float, float]], int) -> bytes
+    """Render a thumbnail of generated items as a PNG at most `size` pixels across.
+
+    Outlines and holes are rasterized straight from the generated geometry, so
+    no SVG renderer is needed.  Without an `extent` (as from measure()) the
+    thumbnail is fitted to the cuts themselves.  With nothing to draw (no
+    items, or all of them at one point) the thumbnail is blank.  Raises
+    ValueError if `size` leaves no room inside the `border`.
+    """
+    if load_numpy() is None:
+        raise ImportError('Thumbnails need NumPy')
+    if not size > 2 * border + 1:
+        raise ValueError('Thumbnail size must be more than {} pixels'.format(2 * border + 1))
+    segments = item_segments(items)
+    if extent is None:
+        xs, ys = segments[:, 0::2], segments[:, 1::2]
+        extent = (xs.min(), ys.min(), xs.max(), ys.max()) if len(segments) else (0, 0, 0, 0)
+    min_x, min_y, max_x, max_y = extent
+    across = max(max_x - min_x, max_y - min_y)
+    if not across > 0:  # measure() gives an inverted extent for no items
+        return png_bytes(rasterize(np.zeros((0, 4)), size, size))
+    scale = (size - 2 * border - 1) / across
+    # the longer side comes to `size` exactly, give or take rounding
+    width = min(int(math.ceil((max_x - min_x) * scale)) + 2 * border + 1, size)
+    height = min(int(math.ceil((max_y - min_y) * scale)) + 2 * border + 1, size)
+    segments = (segments - (min_x, min_y, min_x, min_y)) * scale + border
+    return png_bytes(rasterize(segments, width, height))
+
+
+class ArchiveSink(object):
+    """Stream generated boxes into a single zip or tar archive.
+
+    Each box is rendered and written as soon as it is added, so only one box
+    is held in memory at a time, plus the names already written (to keep them
+    unique) and, for zip files, the directory entry of each file, which is
+    written at the end.  Manifest lines (one JSON object per box) are spooled
+    to a temporary file and stored last, as `manifest.jsonl`, when the sink is
+    closed; read_manifest() reads it back.
+    The archive type follows the file name: .zip, .tar, .tar.gz/.tgz or .tar.bz2.
+    With a `thumbnail_size`, a PNG preview (see render_png) is stored beside
+    each SVG, and with `verify` each box is checked with verify_pieces and its
+    warnings listed in the manifest.  A name already in the archive (such as
+    a spec added twice) gets a sequence number: box.svg, box-2.svg, ...
+    Boxes added with several `workers` share one pool (see make_pool()) until
+    the sink is closed.
+
+        with ArchiveSink('catalogue.zip') as sink:
+            for spec in specs:
+                sink.add(spec)
+    """
+
+    def __init__(self, path, thumbnail_size=None, verify=False):
+        # type: (str, Optional[int], bool) -> None
+        import tarfile
+        import tempfile
+        import zipfile
+        if thumbnail_size is not None and not thumbnail_size > 2 * THUMBNAIL_BORDER + 1:
+            raise ValueError('Thumbnail size must be more than {} pixels'.format(
+                2 * THUMBNAIL_BORDER + 1))
+        self.thumbnail_size = thumbnail_size
+        self.verify = verify
+        self._zip = path.endswith('.zip')
+        if self._zip:
+            self._archive = zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED)
+        elif path.endswith('.tar'):
+            self._archive = tarfile.open(path, 'w')
+        elif path.endswith('.tar.gz') or path.endswith('.tgz'):
+            self._archive = tarfile.open(path, 'w:gz')
+        elif path.endswith('.tar.bz2'):
+            self._archive = tarfile.open(path, 'w:bz2')
+        else:
+            raise ValueError('Unknown archive type: {}'.format(path))
+        self._names = set([MANIFEST_NAME])
+        self._pools = {}  # type: Dict[Tuple[int, str], Any]
+        fd, self._manifest_path = tempfile.mkstemp(suffix='.jsonl')
+        self._manifest = os.fdopen(fd, 'wb')
+
+    def add(self, spec, name=None, workers=1, pool_type='process'):
+        # type: (Dict[str, Any], Optional[str], int, str) -> Dict[str, Any]
+        """Generate the box for `spec`, write it, and return its manifest entry."""
+        import json
+        if (workers, pool_type) not in self._pools:
+            self._pools[workers, pool_type] = make_pool(workers, pool_type)
+        settings, jobs, pieces = make_pieces(spec, workers, pool_type,
+                                             self._pools[workers, pool_type])
+        items = [item for piece in pieces for item in piece.items()]
+        digest = spec_hash(spec)
+        if name is None:
+            name = digest[:16] + '.svg'
+        name = self._unique(name)
+        extent = measure(items)
+        data = render_svg(items, settings['line_thickness'], extent[:4])
+        self._write(name, data)
+
+        entry = {'name'      : name,
+                 'spec_hash' : digest,
+                 'dimensions': [settings['x'], settings['y'], settings['z']],
+                 'pieces'    : count_pieces(jobs),
+                 'cut_length': extent[4],
+                 'bytes'     : len(data)}
+        if self.thumbnail_size:
+            entry['thumbnail'] = self._unique(os.path.splitext(name)[0] + '.png')
+            self._write(entry['thumbnail'],
+                        render_png(items, self.thumbnail_size, extent[:4]), False)
+        if self.verify:
+            entry['warnings'] = verify_pieces(pieces, settings)
+        self._manifest.write((json.dumps(entry, sort_keys=True) + '\n').encode('utf-8'))
+        return entry
+
+    def _unique(self, name):
+        # type: (str) -> str
+        """Reserve `name` in the archive, numbering it if it is already taken."""
+        root, ext = os.path.splitext(name)
+        count = 1
+        while name in self._names:
+            count += 1
+            name = '{}-{}{}'.format(root, count, ext)
+        self._names.add(name)
+        return name
+
+    def _write(self, name, data, compress=True):
+        # type: (str, bytes, bool) -> None
+        if self._zip:
+            import zipfile
+            self._archive.writestr(name, data, zipfile.ZIP_DEFLATED if compress
+                                   else zipfile.ZIP_STORED)
+        else:
+            info = self._archive.tarinfo(name)
+            info.size = len(data)
+            info.mtime = time.time()
+            self._archive.addfile(info, io.BytesIO(data))
+            # TarFile keeps the TarInfo of every member written; only reading
+            # needs them
+            self._archive.members = []
+
+    def close(self):
+        # type: () -> None
+        self._manifest.close()
+        try:
+            if self._zip:
+                self._archive.write(self._manifest_path, MANIFEST_NAME)
             else:
-                side_d = side(root_coord=(x_, y_ + dy),
-                              start_offset_coord=(d, -c),
-                              end_offset_coord=(d, a),
-                              tab_vec=d_tabs * (-thickness if d else thickness),
-                              length=dy,
-                              direction=(0, -1),
-                              is_tab=d,
-                              is_divider=False,
-                              num_dividers=(key_div_floor | wall) * (
-                                      key_div_walls | floor) * div_y * x_holes *
-                                           d_tabs,
-                              div_spacing=x_spacing,
-                              div_offset=div_offset)
-
-            draw_lines(side_a)
-            draw_lines(side_b)
-            draw_lines(side_c)
-            draw_lines(side_d)
-
-            if idx == 0:
-                if not key_div_walls:
-                    a = 1
-                    b = 1
-                    c = 1
-                    d = 1
-                    a_tabs = 0
-                    b_tabs = 0
-                    c_tabs = 0
-                    d_tabs = 0
-                y_ = 4 * spacing + 1 * y + 2 * z  # root y co-ord for piece
-                for n in range(0, div_x):  # generate x dividers
-                    x_ = n * (spacing + x)  # root x co-ord for piece
-
-                    side_a = side(root_coord=(x_, y_),
-                                  start_offset_coord=(d, a),
-                                  end_offset_coord=(-b, a),
-                                  tab_vec=key_div_floor * a_tabs * (
-                                      -thickness if a else thickness),
-                                  length=dx,
-                                  direction=(1, 0),
-                                  is_tab=a,
-                                  is_divider=True,
-                                  num_dividers=0,
-                                  div_spacing=0,
-                                  div_offset=div_offset)
-
-                    side_b = side(root_coord=(x_ + dx, y_),
-                                  start_offset_coord=(-b, a),
-                                  end_offset_coord=(-b, -c),
-                                  tab_vec=key_div_walls * b_tabs * (
-                                      thickness if key_div_walls * b else -thickness),
-                                  length=dy,
-                                  direction=(0, 1),
-                                  is_tab=b,
-                                  is_divider=True,
-                                  num_dividers=div_y * x_holes,
-                                  div_spacing=x_spacing,
-                                  div_offset=div_offset)
-
-                    side_c = side(root_coord=(x_ + dx, y_ + dy),
-                                  start_offset_coord=(-b, -c),
-                                  end_offset_coord=(d, -c),
-                                  tab_vec=key_div_floor * c_tabs * (
-                                      thickness if c else -thickness),
-                                  length=dx,
-                                  direction=(-1, 0),
-                                  is_tab=c,
-                                  is_divider=True,
-                                  num_dividers=0,
-                                  div_spacing=0,
-                                  div_offset=div_offset)
-
-                    side_d = side(root_coord=(x_, y_ + dy),
-                                  start_offset_coord=(d, -c),
-                                  end_offset_coord=(d, a),
-                                  tab_vec=key_div_walls * d_tabs * (
-                                      -thickness if d else thickness),
-                                  length=dy,
-                                  direction=(0, -1),
-                                  is_tab=d,
-                                  is_divider=True,
-                                  num_dividers=0,
-                                  div_spacing=0,
-                                  div_offset=div_offset)
-
-                    draw_lines(side_a)
-                    draw_lines(side_b)
-                    draw_lines(side_c)
-                    draw_lines(side_d)
-            elif idx == 1:
-                y_ = 5 * spacing + 1 * y + 3 * z  # root y co-ord for piece
-                for n in range(0, div_y):  # generate y dividers
-                    x_ = n * (spacing + z)  # root x co-ord for piece
-
-                    side_a = side(root_coord=(x_, y_),
-                                  start_offset_coord=(d, a),
-                                  end_offset_coord=(-b, a),
-                                  tab_vec=key_div_walls * a_tabs * (
-                                      -thickness if a else thickness),
-                                  length=dx,
-                                  direction=(1, 0),
-                                  is_tab=a,
-                                  is_divider=True,
-                                  num_dividers=div_x * y_holes,
-                                  div_spacing=y_spacing,
-                                  div_offset=thickness)
-
-                    side_b = side(root_coord=(x_ + dx, y_),
-                                  start_offset_coord=(-b, a),
-                                  end_offset_coord=(-b, -c),
-                                  tab_vec=key_div_floor * b_tabs * (
-                                      thickness if b else -thickness),
-                                  length=dy,
-                                  direction=(0, 1),
-                                  is_tab=b,
-                                  is_divider=True,
-                                  num_dividers=0,
-                                  div_spacing=0,
-                                  div_offset=thickness)
-
-                    side_c = side(root_coord=(x_ + dx, y_ + dy),
-                                  start_offset_coord=(-b, -c),
-                                  end_offset_coord=(d, -c),
-                                  tab_vec=key_div_walls * c_tabs * (
-                                      thickness if c else -thickness),
-                                  length=dx,
-                                  direction=(-1, 0),
-                                  is_tab=c,
-                                  is_divider=True,
-                                  num_dividers=0,
-                                  div_spacing=0,
-                                  div_offset=thickness)
-
-                    side_d = side(root_coord=(x_, y_ + dy),
-                                  start_offset_coord=(d, -c),
-                                  end_offset_coord=(d, a),
-                                  tab_vec=key_div_floor * d_tabs * (
-                                      -thickness if d else thickness),
-                                  length=dy,
-                                  direction=(0, -1),
-                                  is_tab=d,
-                                  is_divider=True,
-                                  num_dividers=0,
-                                  div_spacing=0,
-                                  div_offset=thickness)
-
-                    draw_lines(side_a)
-                    draw_lines(side_b)
-                    draw_lines(side_c)
-                    draw_lines(side_d)
-
-
-# Create effect instance and apply it.
-effect = BoxMaker()
-effect.affect()
+                self._archive.add(self._manifest_path, arcname=MANIFEST_NAME)
+            self._archive.close()
+        finally:
+            os.remove(self._manifest_path)
+            for pool in self._pools.values():
+                if pool is not None:
+                    pool.close()
+                    pool.join()
+            self._pools = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def read_manifest(path):
+    # type: (str) -> List[Dict[str, Any]]
+    """Read the manifest of an archive written by ArchiveSink.
+
+    A zip file's manifest is found from its directory, and a plain tar's by
+    skipping from header to header, without reading the boxes.  A compressed
+    tar has no index, so everything before the manifest (the whole archive)
+    is decompressed to reach it.
+    """
+    import json
+    import tarfile
+    import zipfile
+    if path.endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            data = archive.read(MANIFEST_NAME)
+    else:
+        with tarfile.open(path) as archive:
+            data = archive.extractfile(MANIFEST_NAME).read()
+    return [json.loads(line) for line in data.decode('utf-8').splitlines() if line]
+
+
+def add_options(parser):
+    # type: (Any) -> None
+    """Add the box options (as named in boxmaker.inx) to an optparse parser."""
+    parser.add_option('--schroff', action='store', type='int',
+                      dest='schroff', default=0,
+                      help='Enable Schroff mode')
+    parser.add_option('--rail_height', action='store', type='float',
+                      dest='rail_height', default=10.0,
+                      help='Height of rail')
+    parser.add_option('--rail_mount_depth', action='store', type='float',
+                      dest='rail_mount_depth', default=17.4,
+                      help='Depth at which to place hole for rail mount '
+                           'bolt')
+    parser.add_option('--rail_mount_centre_offset', action='store',
+                      type='float',
+                      dest='rail_mount_centre_offset', default=0.0,
+                      help='How far toward row centreline to offset rail '
+                           'mount bolt (from rail centreline)')
+    parser.add_option('--rows', action='store', type='int',
+                      dest='rows', default=0,
+                      help='Number of Schroff rows')
+    parser.add_option('--hp', action='store', type='int',
+                      dest='hp', default=0,
+                      help='Width (TE/HP units) of Schroff rows')
+    parser.add_option('--row_spacing', action='store', type='float',
+                      dest='row_spacing', default=10.0,
+                      help='Height of rail')
+    parser.add_option('--unit', action='store', type='string',
+                      dest='unit', default='mm', help='Measure Units')
+    parser.add_option('--inside', action='store', type='int',
+                      dest='inside', default=0, help='Int/Ext Dimension')
+    parser.add_option('--length', action='store', type='float',
+                      dest='length', default=100, help='Length of Box')
+    parser.add_option('--width', action='store', type='float',
+                      dest='width', default=100, help='Width of Box')
+    parser.add_option('--depth', action='store', type='float',
+                      dest='height', default=100, help='Height of Box')
+    parser.add_option('--tab', action='store', type='float',
+                      dest='tab', default=25, help='Nominal Tab Width')
+    parser.add_option('--equal', action='store', type='int',
+                      dest='equal', default=0, help='Equal/Prop Tabs')
+    parser.add_option('--hairline', action='store', type='int',
+                      dest='hairline', default=0, help='Line Thickness')
+    parser.add_option('--thickness', action='store', type='float',
+                      dest='thickness', default=10,
+                      help='Thickness of Material')
+    parser.add_option('--kerf', action='store', type='float',
+                      dest='kerf', default=0.5, help='Kerf (width) of cut')
+    parser.add_option('--clearance', action='store', type='float',
+                      dest='clearance', default=0.01,
+                      help='Clearance of joints')
+    parser.add_option('--style', action='store', type='int',
+                      dest='style', default=25, help='Layout/Style')
+    parser.add_option('--spacing', action='store', type='float',
+                      dest='spacing', default=25, help='Part Spacing')
+    parser.add_option('--boxtype', action='store', type='int',
+                      dest='boxtype', default=25, help='Box type')
+    parser.add_option('--div_l', action='store', type='int',
+                      dest='div_l', default=25,
+                      help='Dividers (Length axis)')
+    parser.add_option('--div_w', action='store', type='int',
+                      dest='div_w', default=25,
+                      help='Dividers (Width axis)')
+    parser.add_option('--keydiv', action='store', type='int',
+                      dest='keydiv', default=3,
+                      help='Key dividers into walls/floor')
+    parser.add_option('--hinge', action='store', type='int',
+                      dest='hinge', default=0,
+                      help='Living hinges on the wall corners')
+    parser.add_option('--hinge_width', action='store', type='float',
+                      dest='hinge_width', default=20.0,
+                      help='Width of each living hinge')
+    parser.add_option('--slit_length', action='store', type='float',
+                      dest='slit_length', default=20.0,
+                      help='Length of living hinge slits')
+    parser.add_option('--slit_spacing', action='store', type='float',
+                      dest='slit_spacing', default=1.5,
+                      help='Spacing between living hinge slits')
+    parser.add_option('--hinge_bridge', action='store', type='float',
+                      dest='hinge_bridge', default=3.0,
+                      help='Uncut length between living hinge slits')
+    parser.add_option('--joint', action='store', type='string',
+                      dest='joint', default='finger',
+                      help='Joint type (finger/dogbone/tbone/tslot)')
+    parser.add_option('--tool_diameter', action='store', type='float',
+                      dest='tool_diameter', default=3.175,
+                      help='Router bit diameter for corner reliefs')
+    parser.add_option('--screw_diameter', action='store', type='float',
+                      dest='screw_diameter', default=3.0,
+                      help='T-slot screw diameter')
+    parser.add_option('--screw_length', action='store', type='float',
+                      dest='screw_length', default=16.0,
+                      help='T-slot screw length')
+    parser.add_option('--nut_width', action='store', type='float',
+                      dest='nut_width', default=5.5,
+                      help='T-slot nut width (across flats)')
+    parser.add_option('--nut_thickness', action='store', type='float',
+                      dest='nut_thickness', default=2.4,
+                      help='T-slot nut thickness')
+    parser.add_option('--jobs', action='store', type='int',
+                      dest='jobs', default=1,
+                      help='Parallel piece jobs (0 = one per CPU)')
+    parser.add_option('--pool', action='store', type='choice',
+                      choices=list(POOL_TYPES), dest='pool', default='process',
+                      help='Pool for parallel jobs (process/thread)')
+    parser.add_option('--verify', action='store', type='int',
+                      dest='verify', default=1,
+                      help='Check the pieces fit together')
+
+
+# Command line.  `python boxmaker.py` takes the same options as the extension
+# (with the boxmaker.inx defaults) and writes one box as SVG, or a batch of
+# boxes to an archive, in millimetres.
+
+LAZY_MODULES = ('inkex', 'simplestyle', 'numpy', 'multiprocessing', 'json', 'tarfile',
+                'zipfile', 'tempfile')  # not imported until used
+
+
+def startup_benchmark(runs=10):
+    # type: (int) -> Tuple[List[Tuple[str, float]], List[str]]
+    """Time fresh interpreters starting up, returning (timings, preloaded).
+
+    Timings are the best of `runs` wall-clock times, in seconds, for bare
+    Python, for `import boxmaker` and for drawing a default box from the
+    command line.  `preloaded` lists any LAZY_MODULES that importing boxmaker
+    loaded anyway (normally none).
+    """
+    import subprocess
+    here = os.path.dirname(os.path.abspath(__file__))
+    commands = [('python', ['-c', 'pass']),
+                ('import boxmaker', ['-c', 'import boxmaker']),
+                ('default box', [os.path.join(here, 'boxmaker.py')])]
+    timings = []
+    with open(os.devnull, 'w') as devnull:
+        for name, args in commands:
+            best = float('inf')
+            for run in range(runs):
+                start = time.time()
+                subprocess.check_call([sys.executable] + args, cwd=here, stdout=devnull)
+                best = min(best, time.time() - start)
+            timings.append((name, best))
+    check = ('import sys, boxmaker\n'
+             'print(" ".join(m for m in boxmaker.LAZY_MODULES if m in sys.modules))')
+    output = subprocess.check_output([sys.executable, '-c', check], cwd=here)
+    return timings, output.decode('utf-8').split()
+
+
+def main(argv=None):
+    # type: (Optional[List[str]]) -> int
+    """Run the command line, returning the exit status."""
+    import optparse
+    parser = optparse.OptionParser(
+        usage='%prog [options]',
+        description='Generate a tabbed box as SVG (to stdout or --output), or write '
+                    'an archive of boxes when --output is a .zip or .tar file.')
+    add_options(parser)
+    parser.set_defaults(**DEFAULT_SPEC)
+    parser.add_option('-o', '--output', action='store', type='string',
+                      dest='output', default='-',
+                      help='SVG file, or .zip/.tar/.tar.gz/.tar.bz2 archive '
+                           '(default: SVG to stdout)')
+    parser.add_option('--specs', action='store', type='string',
+                      dest='specs', default=None,
+                      help='JSON lines file of specs to write to the archive, '
+                           'each on top of the options given')
+    parser.add_option('--thumbnails', action='store', type='int',
+                      dest='thumbnails', default=None,
+                      help='Size in pixels of PNG previews stored in the archive '
+                           '(default: none)')
+    parser.add_option('--benchmark', action='store_true',
+                      dest='benchmark', default=False,
+                      help='Time start-up and drawing a default box, then exit')
+    parser.add_option('--self-check', action='store_true',
+                      dest='self_check', default=False,
+                      help='Check that Check Geometry finds the same faults with '
+                           'every joint type, then exit')
+    options, args = parser.parse_args(argv)
+    if args:
+        parser.error('unexpected argument: {}'.format(args[0]))
+
+    if options.benchmark:
+        timings, preloaded = startup_benchmark()
+        for name, seconds in timings:
+            print('{:<16}{:8.1f} ms'.format(name, seconds * 1000))
+        print('loaded on import: {}'.format(' '.join(preloaded) or 'nothing slow'))
+        return 0
+
+    if options.self_check:
+        failures = verify_self_check()
+        for failure in failures:
+            print(failure)
+        print('self check {}'.format('failed' if failures else 'passed'))
+        return 1 if failures else 0
+
+    spec = dict((key, getattr(options, key)) for key in DEFAULT_SPEC)
+    archive = options.output != '-' and not options.output.endswith('.svg')
+    if options.specs and not archive:
+        parser.error('--specs needs an archive --output')
+    if options.thumbnails is not None and options.thumbnails <= 0:
+        parser.error('--thumbnails must be a positive number of pixels')
+
+    if archive:
+        specs = [('', spec)]
+        if options.specs:
+            import json
+            with open(options.specs) as f:
+                specs = [('{}:{}: '.format(options.specs, n + 1), dict(spec, **json.loads(line)))
+                         for n, line in enumerate(f) if line.strip()]
+        status = 0
+        try:
+            sink = ArchiveSink(options.output, options.thumbnails, options.verify)
+        except ValueError as error:
+            parser.error(str(error))
+        with sink:
+            for where, box in specs:
+                try:
+                    entry = sink.add(box, workers=options.jobs, pool_type=options.pool)
+                except ValueError as error:  # skip boxes that can't be made
+                    sys.stderr.write('{}{}\n'.format(where, error))
+                    status = 1
+                    continue
+                for warning in entry.get('warnings', []):
+                    sys.stderr.write('{}: {}\n'.format(entry['name'], warning))
+        return status
+
+    try:
+        settings, jobs, pieces = make_pieces(spec, options.jobs, options.pool)
+    except ValueError as error:
+        sys.stderr.write('{}\n'.format(error))
+        return 1
+
+    data = render_svg([item for piece in pieces for item in piece.items()],
+                      settings['line_thickness'])
+    if options.output == '-':
+        getattr(sys.stdout, 'buffer', sys.stdout).write(data)
+    else:
+        with open(options.output, 'wb') as f:
+            f.write(data)
+    if options.verify:
+        for warning in verify_pieces(pieces, settings):
+            sys.stderr.write('{}\n'.format(warning))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,130 @@
+#! /usr/bin/env python
+"""
+Inkscape extension for BoxMaker: draws the box generated by boxmaker.py into
+the current document.
+
+This is the script boxmaker.inx runs.  It is the only module that imports
+inkex, so boxmaker itself can be imported (and run from the command line)
+without Inkscape.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+import math
+
+import inkex
+import simplestyle
+
+from boxmaker import (add_options, box_jobs, box_settings, check_settings, get_pieces,
+                      log, run_jobs, verify_pieces)
+
+inkex.localize()
+
+DEFAULT_LINE_THICKNESS = 1  # default unless overridden by settings
+
+
+def draw_lines(xy_string):  # Draw lines from a list
+    name = 'part'
+    style = {'stroke'      : '#000000',
+             'stroke-width': str(DEFAULT_LINE_THICKNESS),
+             'fill'        : 'none'}
+    drw = {'style'                         : simplestyle.formatStyle(style),
+           inkex.addNS('label', 'inkscape'): name, 'd': xy_string}
+    inkex.etree.SubElement(parent, inkex.addNS('path', 'svg'), drw)
+    return
+
+
+# jslee - shamelessly adapted from sample code on below Inkscape wiki page 2015-07-28
+# http://wiki.inkscape.org/wiki/index.php/Generating_objects_from_extensions
+def draw_circle(r, cx, cy):
+    log("putting circle at ({},{})".format(cx, cy))
+
+    style = {'stroke'      : '#000000',
+             'stroke-width': str(DEFAULT_LINE_THICKNESS),
+             'fill'        : 'none'}
+
+    ell_attribs = {'style'                         : simplestyle.formatStyle(style),
+                   inkex.addNS('cx', 'sodipodi')   : str(cx),
+                   inkex.addNS('cy', 'sodipodi')   : str(cy),
+                   inkex.addNS('rx', 'sodipodi')   : str(r),
+                   inkex.addNS('ry', 'sodipodi')   : str(r),
+                   inkex.addNS('start', 'sodipodi'): str(0),
+                   inkex.addNS('end', 'sodipodi')  : str(2 * math.pi),
+                   inkex.addNS('open', 'sodipodi') : 'true',
+                   # all ellipse sectors we will draw are open
+                   inkex.addNS('type', 'sodipodi') : 'arc',
+                   'transform'                     : ''}
+    inkex.etree.SubElement(parent, inkex.addNS('path', 'svg'), ell_attribs)
+
+
+class BoxMaker(inkex.Effect):
+    def __init__(self):
+        # Call the base class constructor.
+        # We are not using super because as of Inkscape 0.92 inkex.Effect is still an
+        #   Old-Style python class that doesn't inherit from `object`
+        inkex.Effect.__init__(self)
+        # Define options
+        add_options(self.OptionParser)
+
+    def effect(self):
+        global parent, DEFAULT_LINE_THICKNESS
+
+        # Get access to main SVG document element and get its dimensions.
+        svg = self.document.getroot()
+
+        # Get the attributes:
+        width_doc = self.unittouu(svg.get('width'))
+        height_doc = self.unittouu(svg.get('height'))
+
+        # Create a new layer.
+        layer = inkex.etree.SubElement(svg, 'g')
+        layer.set(inkex.addNS('label', 'inkscape'), 'newlayer')
+        layer.set(inkex.addNS('groupmode', 'inkscape'), 'layer')
+
+        parent = self.current_layer
+
+        # Get script's option values in document units.
+        settings = box_settings(vars(self.options), self.unittouu)
+
+        # Set the line thickness
+        DEFAULT_LINE_THICKNESS = settings['line_thickness']
+
+        errors = check_settings(settings, max(width_doc, height_doc))
+        for error in errors:
+            inkex.errormsg(error)
+        if errors:
+            exit()
+
+        pieces = get_pieces(settings['box_type'], settings['layout'],
+                            settings['x'], settings['y'], settings['z'])
+        jobs = box_jobs(settings, pieces)
+
+        # generate the pieces (possibly in parallel) and draw them in job order
+        pieces = [piece for result in run_jobs(jobs, self.options.jobs, self.options.pool)
+                  for piece in result]
+        for piece in pieces:
+            for item in piece.items():
+                if item[0] == 'circle':
+                    draw_circle(*item[1:])
+                else:
+                    draw_lines(item[1])
+
+        if self.options.verify:
+            for warning in verify_pieces(pieces, settings):
+                inkex.errormsg(warning)
+
+
+if __name__ == '__main__':
+    # Create effect instance and apply it.
+    effect = BoxMaker()
+    effect.affect()